@@ -0,0 +1,81 @@
+#
+# Benchmark package import time
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+# Times cold imports of the profile modules in fresh interpreters and
+# exits with status 1 if the import takes longer than the budget or
+# pulls in astropy/astroplan, so it can be used as a regression check:
+#
+#     python benchmarks/bench_import.py --budget 0.5
+#
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+MODULE = 'pyastroprofile.AstroProfile'
+HEAVY_MODULES = ('astropy', 'astroplan')
+
+CHECK = f'''
+import sys
+import {MODULE}
+heavy = [m for m in sys.modules if m.split('.')[0] in {HEAVY_MODULES!r}]
+print(','.join(heavy))
+'''
+
+def run(code):
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return time.perf_counter() - t0, out.strip()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type=float, default=0.5,
+                        help='Allowed import time in seconds')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of interpreters to time')
+    args = parser.parse_args()
+
+    t_base = min(run('pass')[0] for i in range(args.repeat))
+    times = []
+    for i in range(args.repeat):
+        t, heavy = run(CHECK)
+        times.append(t - t_base)
+
+    t_import = min(times)
+    print(f'interpreter startup   : {t_base * 1e3:10.1f} ms')
+    print(f'import {MODULE}: {t_import * 1e3:10.1f} ms '
+          f'(budget {args.budget * 1e3:.0f} ms)')
+
+    failed = False
+    if heavy:
+        print(f'FAIL: import pulled in {heavy}')
+        failed = True
+    if t_import > args.budget:
+        print('FAIL: import time over budget')
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#
+# Benchmark observer access
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+# Compares building an astroplan Observer with repeated access of the
+# cached ObservatoryProfile.observer attribute.
+#
+import timeit
+
+import astropy.units as u
+from astroplan import Observer
+
+from pyastroprofile.ObservatoryProfile import ObservatoryProfile
+
+NLOOP = 1000
+
+def main():
+    obs = ObservatoryProfile(reldir=None, name='bench_observatory')
+    obs.location.obsname = 'Benchmark Location'
+    obs.location.latitude = 35.8
+    obs.location.longitude = -78.8
+    obs.location.altitude = 100.0
+    obs.location.timezone = 'US/Eastern'
+
+    def build():
+        return Observer(longitude=obs.location.longitude * u.deg,
+                        latitude=obs.location.latitude * u.deg,
+                        elevation=obs.location.altitude * u.m,
+                        timezone=obs.location.timezone,
+                        name=obs.location.obsname)
+
+    def cached():
+        return obs.observer
+
+    t_build = timeit.timeit(build, number=NLOOP) / NLOOP
+    t_cached = timeit.timeit(cached, number=NLOOP) / NLOOP
+
+    print(f'Observer construction : {t_build * 1e6:10.2f} us')
+    print(f'cached observer access: {t_cached * 1e6:10.2f} us')
+    print(f'speedup               : {t_build / t_cached:10.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#
+# Benchmark profile reading
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+# Writes a synthetic tree of profiles to a temporary directory and times
+# reading all of them with the pure python and the LibYAML yaml loaders,
+# from the on-disk compiled profile cache as a new process would, from
+# an SQLite profile database, from a memory-mapped bundle and then
+# re-reading them from the in-memory parsed profile cache.
+#
+#     python benchmarks/bench_profiles.py --count 2000
+#
+import os
+import time
+import argparse
+import tempfile
+
+import yaml
+
+import pyastroprofile.ProfileDict as ProfileDict
+from pyastroprofile.Storage import SqliteStorage, YamlStorage
+from pyastroprofile.Storage import copy_profiles, set_storage
+from pyastroprofile.Bundle import BundleStorage, export_bundle
+from pyastroprofile.EquipmentProfile import EquipmentProfile
+from pyastroprofile.ObservatoryProfile import ObservatoryProfile
+
+def make_tree(root, count):
+    profiles = []
+    for i in range(count):
+        eq = EquipmentProfile(reldir=os.path.join(root, 'equipment'),
+                              name=f'equipment_{i}.yaml')
+        eq.camera.driver = f'CCD Simulator {i}'
+        eq.focuser.minpos = i
+        eq.focuser.maxpos = 10000 + i
+        eq.filterwheel.names = [f'Filter {j}' for j in range(7)]
+        eq.mount.pier_collision_zones = [[-30.0, -20.0, -10.0, float(i % 10)]]
+        eq.write()
+        profiles.append(eq)
+
+        obs = ObservatoryProfile(reldir=os.path.join(root, 'observatories'),
+                                 name=f'observatory_{i}.yaml')
+        obs.location.obsname = f'Site {i}'
+        obs.location.latitude = 35.0 + i * 1e-3
+        obs.location.longitude = -78.0 - i * 1e-3
+        obs.location.altitude = 100.0
+        obs.location.timezone = 'US/Eastern'
+        obs.write()
+        profiles.append(obs)
+    return profiles
+
+def read_all(profiles):
+    t0 = time.perf_counter()
+    for p in profiles:
+        fresh = p.__class__(reldir=p._config_reldir, name=p._config_filename)
+        fresh.read(**({'load_horizon': False}
+                      if isinstance(fresh, ObservatoryProfile) else {}))
+    return time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=2000,
+                        help='Number of equipment/observatory profile pairs')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        # keep the compiled profile cache out of the real config dir
+        os.environ['HOME'] = root
+
+        profiles = make_tree(root, args.count)
+        print(f'{len(profiles)} profiles')
+
+        # hold the whole tree so the warm pass is all cache hits
+        ProfileDict.YAML_CACHE_SIZE = len(profiles)
+
+        fast_loader = ProfileDict._SafeLoader
+        ProfileDict._SafeLoader = yaml.SafeLoader
+        try:
+            ProfileDict.clear_yaml_cache()
+            t_python = read_all(profiles)
+        finally:
+            ProfileDict._SafeLoader = fast_loader
+        ProfileDict.clear_yaml_cache()
+        t_fast = read_all(profiles)
+        t_warm = read_all(profiles)
+
+        ProfileDict.enable_profile_cache(True)
+        ProfileDict.clear_yaml_cache()
+        read_all(profiles)
+        ProfileDict.clear_yaml_cache()
+        t_compiled = read_all(profiles)
+        ProfileDict.enable_profile_cache(None)
+
+        db = SqliteStorage(os.path.join(root, 'profiles.db'))
+        for subdir in ('equipment', 'observatories'):
+            copy_profiles(YamlStorage(), db, os.path.join(root, subdir))
+        set_storage(db)
+        try:
+            t_sqlite = read_all(profiles)
+        finally:
+            set_storage(None)
+            db.close()
+
+        bundle_file = os.path.join(root, 'profiles.bundle')
+        export_bundle(bundle_file, root=root)
+        # include opening the bundle
+        t0 = time.perf_counter()
+        bundle = BundleStorage(bundle_file, root=root)
+        set_storage(bundle)
+        try:
+            read_all(profiles)
+            t_bundle = time.perf_counter() - t0
+        finally:
+            set_storage(None)
+            bundle.close()
+
+        print(f'python yaml loader      : {t_python:8.3f} s')
+        print(f'{fast_loader.__name__:24s}: {t_fast:8.3f} s '
+              f'({t_python / t_fast:.1f}x)')
+        print(f'compiled cache cold     : {t_compiled:8.3f} s '
+              f'({t_python / t_compiled:.1f}x)')
+        print(f'sqlite storage          : {t_sqlite:8.3f} s '
+              f'({t_python / t_sqlite:.1f}x)')
+        print(f'bundle storage          : {t_bundle:8.3f} s '
+              f'({t_python / t_bundle:.1f}x)')
+        print(f'in-memory cache hits    : {t_warm:8.3f} s '
+              f'({t_python / t_warm:.1f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -18,14 +18,14 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 import os
-import glob
-import yaml
 import logging
 
 from pyastroprofile.ProfileDict import get_base_config_dir
+from pyastroprofile.Storage import get_storage
 from pyastroprofile.EquipmentProfile import EquipmentProfile
 from pyastroprofile.ObservatoryProfile import ObservatoryProfile
 from pyastroprofile.SettingsProfile import SettingsProfile
+from pyastroprofile.Reachability import ReachabilityMask, mount_limits_key
 
 # FIXME this should be something globally configured!
 ASTROPROFILE_ROOT_RELDIR = 'astroprofiles'
@@ -39,11 +39,10 @@ def get_astroprofile_base_dir():
     return os.path.join(get_base_config_dir(), ASTROPROFILE_ROOT_RELDIR)
 
 def get_available_profiles():
-    prof = glob.glob(os.path.join(get_astroprofile_base_dir(), '*.yaml'))
+    prof = get_storage().list(get_astroprofile_base_dir(), '*' + ASTROPROFILE_EXT)
     rc = []
     for p in prof:
-        b = os.path.basename(p)
-        s, e = os.path.splitext(b)
+        s, e = os.path.splitext(p)
         rc.append(s)
     return rc
 
@@ -76,15 +75,66 @@ class AstroProfile:
     :func:`get_astroprofile_base_dir` and contains the names of
     the individual profile files for the different profiles
     contained by the :class:`AstroProfile`.
+
+    Programs which only need a few values can use
+    ``ap.read('myastroprofile', lazy=True)`` so that only the profiles
+    actually accessed are read from disk.
     """
 
     def __init__(self):
-        #: Use to access the equipment profile.
-        self.equipment = None
-        #: Use to access the observatory profile.
-        self.observatory = None
-        #: Use to access the settings profile.
-        self.settings = None
+        self._equipment = None
+        self._observatory = None
+        self._settings = None
+
+        # profiles named by read(lazy=True) which are not read yet
+        self._pending = {}
+
+        # (key, mask) for each pierside requested from reachability_mask()
+        self._reachability = {}
+
+    def _get_profile(self, attr):
+        pending = self._pending.pop(attr, None)
+        if pending is not None:
+            section, name = pending
+            logging.debug(f'AstroProfile: reading {attr} profile {name}')
+            profile = self._create_section(section, name)
+            if section is ObservatoryProfile:
+                profile.read(load_horizon=False)
+            else:
+                profile.read()
+            setattr(self, '_' + attr, profile)
+        return getattr(self, '_' + attr)
+
+    def _set_profile(self, attr, profile):
+        self._pending.pop(attr, None)
+        setattr(self, '_' + attr, profile)
+
+    @property
+    def equipment(self):
+        """Use to access the equipment profile."""
+        return self._get_profile('equipment')
+
+    @equipment.setter
+    def equipment(self, profile):
+        self._set_profile('equipment', profile)
+
+    @property
+    def observatory(self):
+        """Use to access the observatory profile."""
+        return self._get_profile('observatory')
+
+    @observatory.setter
+    def observatory(self, profile):
+        self._set_profile('observatory', profile)
+
+    @property
+    def settings(self):
+        """Use to access the settings profile."""
+        return self._get_profile('settings')
+
+    @settings.setter
+    def settings(self, profile):
+        self._set_profile('settings', profile)
 
     def _create_section(self, section, name):
         relpath = os.path.join(get_astroprofile_base_dir(), section._conf_rel_dir)
@@ -105,9 +155,9 @@ class AstroProfile:
         """
         path = get_astroprofile_base_dir()
 
-        # FIXME might be better to have extension a constant?
-        def_fname = os.path.join(path, ref_name + ASTROPROFILE_EXT)
-        if os.path.isfile(def_fname) and not overwrite:
+        storage = get_storage()
+        def_name = ref_name + ASTROPROFILE_EXT
+        if storage.exists(path, def_name) and not overwrite:
             logging.error(f'Reference file {ref_name} already exists and '
                           'overwrite=False')
             return False
@@ -116,26 +166,26 @@ class AstroProfile:
                   ('observatory', observatory_profile),
                   ('settings', settings_profile)])
 
-        with open(def_fname, 'w') as f:
-            yaml.dump(d, stream=f)
-
-        return True
+        return storage.write(path, def_name, d)
 
     # an astroprofile is a text file which contains the names of the
     # equipment, observatory, and settings profiles
-    def read(self, name):
+    def read(self, name, lazy=False):
         """
         Read an :class:`AstroProfile`.
 
         :param str name: Name of astroprofile file to be loaded.
+        :param bool lazy: If True each profile is only read when it is first
+                          accessed and the horizon is only loaded when
+                          ``observatory.horizon`` is first used.
         """
         path = get_astroprofile_base_dir()
         def_fname = os.path.join(path, name + ASTROPROFILE_EXT)
         logging.info(f'Loading astroprofile file {def_fname}')
         ap = None
-        if os.path.isfile(def_fname):
-            with open(def_fname, 'r') as f:
-                ap = yaml.safe_load(stream=f)
+        storage = get_storage()
+        if storage.exists(path, name + ASTROPROFILE_EXT):
+            ap = storage.read(path, name + ASTROPROFILE_EXT)
             if ap is None:
                 return False
 
@@ -148,6 +198,13 @@ class AstroProfile:
             if any(x is None for x in lst):
                 return False
 
+            if lazy:
+                self._equipment = self._observatory = self._settings = None
+                self._pending = {'equipment': (EquipmentProfile, equip_profile),
+                                 'observatory': (ObservatoryProfile, obs_profile),
+                                 'settings': (SettingsProfile, set_profile)}
+                return True
+
             self.equipment = self._create_section(EquipmentProfile, equip_profile)
             self.observatory = self._create_section(ObservatoryProfile, obs_profile)
             self.settings = self._create_section(SettingsProfile, set_profile)
@@ -159,6 +216,38 @@ class AstroProfile:
 
         return False
 
+    def reachability_mask(self, pierside=None, az_resolution=0.25,
+                          alt_resolution=0.25):
+        """
+        Returns a :class:`pyastroprofile.Reachability.ReachabilityMask`
+        combining the mount limits of the equipment profile with the
+        horizon of the observatory profile.
+
+        The mask is cached and only rebuilt when a mount limit, the site
+        latitude or the horizon changes.
+
+        :param str pierside: 'east' or 'west' pointing state or None if
+                             either may be used.
+        :param float az_resolution: Azimuth cell size in degrees.
+        :param float alt_resolution: Altitude cell size in degrees.
+        """
+        horizon = self.observatory.horizon
+        key = (mount_limits_key(self.equipment.mount),
+               self.observatory.location.latitude, horizon.fingerprint(),
+               az_resolution, alt_resolution)
+
+        cached = self._reachability.get(pierside)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        mask = ReachabilityMask(self.equipment.mount,
+                                self.observatory.location.latitude,
+                                horizon=horizon, pierside=pierside,
+                                az_resolution=az_resolution,
+                                alt_resolution=alt_resolution)
+        self._reachability[pierside] = (key, mask)
+        return mask
+
     def __repr__(self):
         return f'AstroProfile(equipment={self.equipment}, ' \
                + f'observatory={self.observatory}, ' \
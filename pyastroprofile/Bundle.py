@@ -0,0 +1,221 @@
+#
+# Single file profile bundle
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import json
+import mmap
+import struct
+import fnmatch
+import logging
+import numpy as np
+import yaml
+
+from pyastroprofile.AstroProfile import get_astroprofile_base_dir
+from pyastroprofile.ProfileDict import read_yaml
+from pyastroprofile.HorizonFormats import read_horizon
+from pyastroprofile.Storage import ProfileStorage, YamlStorage
+
+# bundle layout:
+#   header  - magic, offset and length of index
+#   blobs   - profile data as JSON and horizon tables as float64 arrays
+#             of azimuths followed by altitudes, each 8 byte aligned
+#   index   - JSON mapping 'location/name' of each profile to (offset,
+#             length), each horizon file to (offset, number of points)
+#             and each location to its default profile
+# locations and horizon files are relative to the astroprofile directory
+BUNDLE_MAGIC = b'APBUNDL1'
+_HEADER = struct.Struct('<8sQQ')
+
+# sidecar and temporary files kept next to profiles which are not bundled
+_SKIP_EXTS = ('.npy', '.npz', '.tmp', '.pickle', '.db')
+
+def _bundle_key(path, root):
+    rel = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+    if rel.startswith(os.pardir):
+        return os.path.abspath(path).replace(os.sep, '/')
+    return rel.replace(os.sep, '/')
+
+def _horizon_files(location, profile):
+    # horizon files named by an observatory profile resolved the same
+    # way as ObservatoryProfile._get_horizon_path()
+    loc = profile.get('location')
+    spec = loc.get('horizon_file') if isinstance(loc, dict) else None
+    if spec is None:
+        return []
+    layers = spec if isinstance(spec, (list, tuple)) else [spec]
+    return [os.path.join(location, x) if os.path.dirname(x) == '' else x
+            for x in layers]
+
+def export_bundle(filename, root=None):
+    """
+    Pack all profiles under the astroprofile directory into one file.
+
+    Every astroprofile reference and equipment, observatory and settings
+    profile is stored, along with the parsed horizon of each observatory,
+    so the bundle can be copied and opened on its own with
+    :class:`BundleStorage`.
+
+    :param str filename: Name of bundle file to write.
+    :param str root: Directory to pack - defaults to
+                     :func:`pyastroprofile.AstroProfile.get_astroprofile_base_dir`.
+    :returns: Number of profiles stored.
+    """
+    if root is None:
+        root = get_astroprofile_base_dir()
+
+    profiles = {}
+    defaults = {}
+    horizon_files = set()
+    for dirpath, dirnames, files in os.walk(root):
+        dirnames.sort()
+        def_name = YamlStorage().get_default(dirpath)
+        if def_name is not None:
+            defaults[_bundle_key(dirpath, root)] = def_name
+        for name in sorted(files):
+            if name.endswith(_SKIP_EXTS):
+                continue
+            try:
+                data = read_yaml(os.path.join(dirpath, name))
+            except (OSError, UnicodeDecodeError, yaml.YAMLError):
+                continue
+            if not isinstance(data, dict):
+                continue
+            loc = _bundle_key(dirpath, root)
+            profiles[f'{loc}/{name}'] = json.dumps(data).encode()
+            horizon_files.update(_horizon_files(dirpath, data))
+
+    horizons = {}
+    for hzn_file in sorted(horizon_files):
+        try:
+            table = read_horizon(hzn_file)
+        except (OSError, ValueError, KeyError):
+            logging.warning(f'export_bundle: unable to read horizon {hzn_file}',
+                            exc_info=True)
+            continue
+        horizons[_bundle_key(hzn_file, root)] = \
+            np.ascontiguousarray(table.T, dtype='<f8')
+
+    index = {'profiles': {}, 'horizons': {}, 'defaults': defaults}
+    tmp_file = f'{filename}.{os.getpid()}.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(_HEADER.pack(BUNDLE_MAGIC, 0, 0))
+        for key, blob in profiles.items():
+            index['profiles'][key] = (f.tell(), len(blob))
+            f.write(blob)
+        for key, table in horizons.items():
+            f.write(b'\0' * (-f.tell() % 8))
+            index['horizons'][key] = (f.tell(), table.shape[1])
+            f.write(table.tobytes())
+
+        index_blob = json.dumps(index).encode()
+        index_offset = f.tell()
+        f.write(index_blob)
+        f.seek(0)
+        f.write(_HEADER.pack(BUNDLE_MAGIC, index_offset, len(index_blob)))
+    os.replace(tmp_file, filename)
+
+    logging.info(f'export_bundle: {len(profiles)} profiles and '
+                 f'{len(horizons)} horizons written to {filename}')
+    return len(profiles)
+
+class BundleStorage(ProfileStorage):
+    """
+    Read only profile storage backed by a bundle from :func:`export_bundle`.
+
+    The bundle is memory-mapped and only the index is decoded when it is
+    opened.  Profiles and horizons are decoded when they are read::
+
+        from pyastroprofile.Storage import set_storage
+        set_storage(BundleStorage('profiles.bundle'))
+        ap = AstroProfile()
+        ap.read('myastroprofile')
+
+    :param str filename: Name of bundle file.
+    :param str root: Astroprofile directory profiles are looked up under -
+                     defaults to
+                     :func:`pyastroprofile.AstroProfile.get_astroprofile_base_dir`.
+    :raises ValueError: If the file is not a bundle.
+    """
+
+    def __init__(self, filename, root=None):
+        self.filename = filename
+        self.root = root if root is not None else get_astroprofile_base_dir()
+
+        with open(filename, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, offset, length = _HEADER.unpack_from(self._map, 0)
+        if magic != BUNDLE_MAGIC:
+            self._map.close()
+            raise ValueError(f'{filename} is not a profile bundle')
+        index = json.loads(self._map[offset:offset + length])
+        self._profiles = index['profiles']
+        self._horizons = index['horizons']
+        self._defaults = index.get('defaults', {})
+
+        # location -> names for list()
+        self._names = {}
+        for key in self._profiles:
+            loc, name = key.rsplit('/', 1)
+            self._names.setdefault(loc, []).append(name)
+        for names in self._names.values():
+            names.sort()
+
+    def close(self):
+        self._map.close()
+
+    def _key(self, location, name):
+        return f'{_bundle_key(location, self.root)}/{name}'
+
+    def read(self, location, name):
+        entry = self._profiles.get(self._key(location, name))
+        if entry is None:
+            raise FileNotFoundError(f'No profile {name} in {location}')
+        offset, length = entry
+        return json.loads(self._map[offset:offset + length])
+
+    def write(self, location, name, data):
+        logging.error(f'BundleStorage: cannot write {name} - '
+                      f'{self.filename} is read only')
+        return False
+
+    def list(self, location, pattern='*'):
+        names = self._names.get(_bundle_key(location, self.root), [])
+        return [x for x in names if fnmatch.fnmatchcase(x, pattern)]
+
+    def exists(self, location, name):
+        return self._key(location, name) in self._profiles
+
+    def get_default(self, location):
+        return self._defaults.get(_bundle_key(location, self.root))
+
+    def set_default(self, location, name):
+        logging.error(f'BundleStorage: cannot set default of {location} - '
+                      f'{self.filename} is read only')
+        return False
+
+    def horizon_table(self, filename):
+        entry = self._horizons.get(_bundle_key(filename, self.root))
+        if entry is None:
+            return None
+        offset, npts = entry
+        table = np.frombuffer(self._map, dtype='<f8', count=2 * npts,
+                              offset=offset).reshape(2, npts)
+        # copy so the bundle can be closed while the horizon is in use
+        return table[0].copy(), table[1].copy()
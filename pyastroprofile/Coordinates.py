@@ -0,0 +1,156 @@
+#
+# Vectorized coordinate conversions
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# All angles are in degrees.  Azimuth is measured from north through
+# east and hour angle is positive west of the meridian.  Refraction is
+# not applied.
+#
+import numpy as np
+
+def wrap180(angle):
+    """Wrap angle(s) into the range [-180, 180) degrees."""
+    return np.mod(np.asarray(angle, dtype=float) + 180.0, 360.0) - 180.0
+
+def hadec_to_altaz(ha, dec, latitude):
+    """
+    Convert hour angle and declination to azimuth and altitude.
+
+    :param ha: Hour angle(s) in degrees.
+    :param dec: Declination(s) in degrees.
+    :param latitude: Latitude of observer in degrees.
+    :returns: (azimuth, altitude) in degrees.
+    """
+    ha = np.radians(ha)
+    dec = np.radians(dec)
+    lat = np.radians(latitude)
+
+    sin_alt = np.sin(dec) * np.sin(lat) + np.cos(dec) * np.cos(lat) * np.cos(ha)
+    alt = np.arcsin(np.clip(sin_alt, -1, 1))
+    az = np.arctan2(-np.cos(dec) * np.sin(ha),
+                    np.sin(dec) * np.cos(lat)
+                    - np.cos(dec) * np.sin(lat) * np.cos(ha))
+    return np.mod(np.degrees(az), 360.0), np.degrees(alt)
+
+def altaz_to_hadec(az, alt, latitude):
+    """
+    Convert azimuth and altitude to hour angle and declination.
+
+    :param az: Azimuth(s) in degrees.
+    :param alt: Altitude(s) in degrees.
+    :param latitude: Latitude of observer in degrees.
+    :returns: (hour angle in [-180, 180), declination) in degrees.
+    """
+    az = np.radians(az)
+    alt = np.radians(alt)
+    lat = np.radians(latitude)
+
+    sin_dec = np.sin(alt) * np.sin(lat) + np.cos(alt) * np.cos(lat) * np.cos(az)
+    dec = np.arcsin(np.clip(sin_dec, -1, 1))
+    ha = np.arctan2(-np.cos(alt) * np.sin(az),
+                    np.sin(alt) * np.cos(lat)
+                    - np.cos(alt) * np.sin(lat) * np.cos(az))
+    return wrap180(np.degrees(ha)), np.degrees(dec)
+
+def altaz_to_vector(az, alt):
+    """Unit vector(s) (east, north, up) with shape (..., 3)."""
+    az = np.radians(az)
+    alt = np.radians(alt)
+    return np.stack(np.broadcast_arrays(np.cos(alt) * np.sin(az),
+                                        np.cos(alt) * np.cos(az),
+                                        np.sin(alt)), axis=-1)
+
+def vector_to_altaz(v):
+    """Azimuth and altitude in degrees of (east, north, up) vector(s)."""
+    v = np.asarray(v, dtype=float)
+    az = np.degrees(np.arctan2(v[..., 0], v[..., 1]))
+    alt = np.degrees(np.arctan2(v[..., 2], np.hypot(v[..., 0], v[..., 1])))
+    return np.mod(az, 360.0), alt
+
+def great_circle_path(start_az, start_alt, end_az, end_alt, nsamples):
+    """
+    Sample great circle paths between pairs of positions.
+
+    :returns: (azimuth, altitude) arrays with shape (..., nsamples).
+    """
+    a = altaz_to_vector(start_az, start_alt)
+    b = altaz_to_vector(end_az, end_alt)
+    a, b = np.broadcast_arrays(a, b)
+
+    cos_w = np.clip(np.sum(a * b, axis=-1), -1, 1)
+    w = np.arccos(cos_w)
+
+    # unit vector perpendicular to a in the plane of a and b
+    u = b - a * cos_w[..., np.newaxis]
+    norm = np.linalg.norm(u, axis=-1, keepdims=True)
+    u = np.divide(u, norm, out=np.zeros_like(u), where=norm > 1e-12)
+
+    t = np.linspace(0.0, 1.0, nsamples)
+    tw = w[..., np.newaxis] * t
+    p = (a[..., np.newaxis, :] * np.cos(tw)[..., np.newaxis]
+         + u[..., np.newaxis, :] * np.sin(tw)[..., np.newaxis])
+    return vector_to_altaz(p)
+
+def local_sidereal_time(jd, longitude, node_spacing=1.0 / 24):
+    """
+    Local apparent sidereal time for many times.
+
+    Sidereal time is computed with astropy at nodes spaced node_spacing
+    days apart covering the times requested and linearly interpolated
+    between them, which is accurate to well under a second of time for
+    the default hourly nodes.
+
+    :param jd: Julian date(s) (UT).
+    :param float longitude: Longitude of observer in degrees east.
+    :param float node_spacing: Spacing of nodes in days.
+    :returns: Local sidereal time(s) in degrees in the range [0, 360).
+    """
+    import astropy.units as u
+    from astropy.time import Time
+
+    jd = np.asarray(jd, dtype=float)
+    jd_min = np.nanmin(jd)
+    nnodes = int(np.ceil((np.nanmax(jd) - jd_min) / node_spacing)) + 2
+    nodes = jd_min + np.arange(nnodes) * node_spacing
+
+    lst = Time(nodes, format='jd').sidereal_time('apparent',
+                                                 longitude=longitude * u.deg)
+    lst = np.unwrap(np.radians(lst.deg))
+    return np.mod(np.degrees(np.interp(jd, nodes, lst)), 360.0)
+
+def apparent_radec(ra, dec, jd):
+    """
+    Convert ICRS coordinates to apparent coordinates of date.
+
+    The apparent place is computed at a single time so the result can
+    be used with :func:`local_sidereal_time` to get hour angles for
+    times near jd.
+
+    :param ra: ICRS right ascension(s) in degrees.
+    :param dec: ICRS declination(s) in degrees.
+    :param float jd: Julian date of the apparent place.
+    :returns: (right ascension, declination) in degrees.
+    """
+    import astropy.units as u
+    from astropy.time import Time
+    from astropy.coordinates import SkyCoord, TETE
+
+    c = SkyCoord(ra=np.asarray(ra, dtype=float) * u.deg,
+                 dec=np.asarray(dec, dtype=float) * u.deg)
+    c = c.transform_to(TETE(obstime=Time(jd, format='jd')))
+    return c.ra.deg, c.dec.deg
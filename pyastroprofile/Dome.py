@@ -0,0 +1,203 @@
+#
+# Dome slit geometry
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import logging
+import numpy as np
+
+from pyastroprofile.Coordinates import altaz_to_vector
+
+def optical_axis_origin(az, alt, offset=(0.0, 0.0, 0.0), gem_offset=0.0,
+                        latitude=None, pierside='east'):
+    """
+    Position of the optical axis origin relative to the dome center.
+
+    For a German equatorial mount the optical axis is displaced from the
+    intersection of the axes along the declination axis, which is
+    perpendicular to both the polar axis and the pointing direction.
+    Which way it is displaced depends on the pointing state.
+
+    :param az: Azimuth(s) of mount pointing in degrees.
+    :param alt: Altitude(s) of mount pointing in degrees.
+    :param offset: (east, north, up) position of the intersection of the
+                   mount axes from the dome center in meters.
+    :param float gem_offset: Distance from the polar axis to the optical
+                             axis along the declination axis in meters or
+                             0 for fork and alt-az mounts.
+    :param float latitude: Latitude in degrees - needed if gem_offset is
+                           not 0.
+    :param str pierside: 'east' or 'west' pointing state as for
+                         :func:`pyastroprofile.Reachability.mount_reachable`.
+    :returns: Array of (east, north, up) positions with shape (..., 3).
+    """
+    pointing = altaz_to_vector(az, alt)
+    origin = np.broadcast_to(np.asarray(offset, dtype=float), pointing.shape)
+    if not gem_offset:
+        return origin
+
+    if latitude is None:
+        raise ValueError('optical_axis_origin: latitude needed for GEM offset')
+    lat = np.radians(latitude)
+    polar = np.array([0.0, np.cos(lat), np.sin(lat)])
+    dec_axis = np.cross(polar, pointing)
+    norm = np.linalg.norm(dec_axis, axis=-1, keepdims=True)
+    # pointing at the pole leaves the dec axis direction undefined
+    dec_axis = np.where(norm > 1e-12, dec_axis / np.maximum(norm, 1e-12),
+                        np.array([1.0, 0.0, 0.0]))
+    if pierside == 'east':
+        sign = -1.0
+    elif pierside == 'west':
+        sign = 1.0
+    else:
+        raise ValueError(f'optical_axis_origin: unknown pierside {pierside}')
+    return origin + sign * gem_offset * dec_axis
+
+def dome_azimuth(az, alt, radius, slit_width, offset=(0.0, 0.0, 0.0),
+                 gem_offset=0.0, latitude=None, pierside='east'):
+    """
+    Compute dome azimuth needed for batches of mount positions.
+
+    The optical axis is traced from its origin to where it leaves the
+    dome, taken to be a sphere centered on the dome center.
+
+    :param az: Azimuth(s) of mount pointing in degrees.
+    :param alt: Altitude(s) of mount pointing in degrees.
+    :param float radius: Radius of dome in meters.
+    :param float slit_width: Width of slit in meters.
+    :param offset: (east, north, up) position of the mount axes from the
+                   dome center in meters.
+    :param float gem_offset: GEM declination axis offset in meters.
+    :param float latitude: Latitude in degrees.
+    :param str pierside: 'east' or 'west' pointing state.
+    :returns: (dome azimuth, tolerance) in degrees where tolerance is how
+              far the dome azimuth may be from the value computed before
+              the optical axis reaches the edge of the slit.  The
+              tolerance is 180 where the slit covers the optical axis
+              for any dome azimuth.  Both are NaN if the optical axis
+              origin is outside the dome.
+    """
+    pointing = altaz_to_vector(az, alt)
+    origin = optical_axis_origin(az, alt, offset=offset, gem_offset=gem_offset,
+                                 latitude=latitude, pierside=pierside)
+
+    # solve |origin + t * pointing| = radius for t > 0
+    b = np.sum(origin * pointing, axis=-1)
+    c = np.sum(origin * origin, axis=-1) - radius * radius
+    with np.errstate(invalid='ignore'):
+        t = -b + np.sqrt(b * b - c)
+    t = np.where(c <= 0, t, np.nan)
+    exit_pt = origin + t[..., np.newaxis] * pointing
+
+    east, north = exit_pt[..., 0], exit_pt[..., 1]
+    dome_az = np.mod(np.degrees(np.arctan2(east, north)), 360.0)
+
+    horiz = np.hypot(east, north)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = 0.5 * slit_width / horiz
+    tolerance = np.where(ratio < 1.0, np.degrees(np.arcsin(np.minimum(ratio, 1.0))),
+                         180.0)
+    tolerance = np.where(np.isnan(t), np.nan, tolerance)
+    return dome_az, tolerance
+
+class DomeLookup:
+    """
+    Precomputed dome azimuth and slit tolerance over an az/alt grid.
+
+    The dome geometry does not change while tracking so the solution
+    for every mount position can be computed once and looked up by
+    rounding to the nearest grid node::
+
+        lut = ap.observatory.dome_lookup()
+        dome_az, tolerance = lut.lookup(az, alt)
+
+    :param dome_az: Dome azimuth table (az nodes x alt nodes).
+    :param tolerance: Tolerance table (az nodes x alt nodes).
+    :param float resolution: Grid spacing in degrees.
+    :param str key: Value identifying the geometry the table is for.
+    """
+
+    def __init__(self, dome_az, tolerance, resolution, key=None):
+        self.dome_az = dome_az
+        self.tolerance = tolerance
+        self.resolution = float(resolution)
+        self.key = key
+
+    @classmethod
+    def compute(cls, radius, slit_width, offset=(0.0, 0.0, 0.0),
+                gem_offset=0.0, latitude=None, pierside='east',
+                resolution=0.25, key=None):
+        """
+        Solve for every grid node - see :func:`dome_azimuth`.
+
+        :param float resolution: Grid spacing in degrees - adjusted so
+                                 it divides 90 evenly.
+        """
+        # same spacing on both axes so lookup() can use one step
+        n_alt = max(1, int(round(90.0 / resolution)))
+        az = np.linspace(0.0, 360.0, 4 * n_alt + 1)
+        alt = np.linspace(0.0, 90.0, n_alt + 1)
+        dome_az, tolerance = dome_azimuth(az[:, np.newaxis], alt[np.newaxis, :],
+                                          radius, slit_width, offset=offset,
+                                          gem_offset=gem_offset,
+                                          latitude=latitude,
+                                          pierside=pierside)
+        return cls(dome_az.astype(np.float32), tolerance.astype(np.float32),
+                   90.0 / n_alt, key=key)
+
+    def lookup(self, az, alt):
+        """
+        Dome azimuth and tolerance for mount positions.
+
+        :param az: Azimuth(s) of mount pointing in degrees.
+        :param alt: Altitude(s) of mount pointing in degrees - clipped to
+                    the range [0, 90].
+        :returns: (dome azimuth, tolerance) in degrees.
+        """
+        i = np.rint(np.mod(az, 360.0) / self.resolution).astype(int)
+        j = np.rint(np.clip(alt, 0.0, 90.0) / self.resolution).astype(int)
+        j = np.minimum(j, self.dome_az.shape[1] - 1)
+        return self.dome_az[i, j], self.tolerance[i, j]
+
+    def save(self, filename):
+        """
+        Save table to a ``.npz`` file.
+
+        :param str filename: Name of file.
+        """
+        tmp_file = f'{filename}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_file, dome_az=self.dome_az, tolerance=self.tolerance,
+                 resolution=self.resolution, key=str(self.key))
+        os.replace(tmp_file, filename)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load table saved with :meth:`save`.
+
+        :param str filename: Name of file.
+        :returns: :class:`DomeLookup` or None if it could not be loaded.
+        """
+        try:
+            with np.load(filename) as data:
+                return cls(data['dome_az'], data['tolerance'],
+                           float(data['resolution']), key=str(data['key']))
+        except (OSError, ValueError, KeyError):
+            logging.debug(f'DomeLookup: unable to load {filename}',
+                          exc_info=True)
+            return None
@@ -0,0 +1,291 @@
+#
+# Cache of nightly sun and moon events
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import logging
+import datetime
+import numpy as np
+
+from pyastroprofile.Coordinates import hadec_to_altaz
+
+#: Sun events as (evening event, morning event, sun altitude in degrees).
+SUN_EVENTS = (('sunset', 'sunrise', 0.0),
+              ('civil_dusk', 'civil_dawn', -6.0),
+              ('nautical_dusk', 'nautical_dawn', -12.0),
+              ('astronomical_dusk', 'astronomical_dawn', -18.0))
+
+#: Names of the values stored for each night.  Events are Julian dates
+#: (UT) and are NaN if the event does not happen within 24 hours of
+#: local noon.  Moon illumination is the fraction illuminated at local
+#: midnight.
+EPHEMERIS_EVENTS = ('sunset', 'civil_dusk', 'nautical_dusk',
+                    'astronomical_dusk', 'astronomical_dawn',
+                    'nautical_dawn', 'civil_dawn', 'sunrise',
+                    'moonrise', 'moonset', 'moon_illumination')
+
+# spacing in days of sun and moon positions which are interpolated
+_NODE_SPACING = 2.0 / 24
+
+# spacing in days of altitudes searched for events
+_GRID_SPACING = 5.0 / 1440
+_NGRID = int(round(1.0 / _GRID_SPACING)) + 1
+
+def date_to_ordinal(date):
+    """
+    Convert a date to its proleptic Gregorian ordinal.
+
+    :param date: :class:`datetime.date`, :class:`datetime.datetime`,
+                 'YYYY-MM-DD' string or an ordinal.
+    """
+    if isinstance(date, (int, np.integer)):
+        return int(date)
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date)
+    return date.toordinal()
+
+def ordinal_to_jd(ordinal):
+    """Julian date of 0h UT on the date with the given ordinal."""
+    return np.asarray(ordinal) + 1721424.5
+
+def local_noon_jd(ordinal, longitude):
+    """Julian date of local mean noon on the date with the given ordinal."""
+    return ordinal_to_jd(ordinal) + 0.5 - longitude / 360.0
+
+class _BodyTrack:
+    """
+    Altitude of the sun or moon computed from positions sampled every
+    couple of hours and interpolated between them.
+    """
+
+    def __init__(self, body, jd_lo, jd_hi, location):
+        from astropy.time import Time
+        from astropy.coordinates import get_body, TETE
+
+        nodes = np.arange(jd_lo - _NODE_SPACING, jd_hi + 2 * _NODE_SPACING,
+                          _NODE_SPACING)
+        t = Time(nodes, format='jd')
+        c = get_body(body, t, location).transform_to(TETE(obstime=t,
+                                                          location=location))
+        lst = t.sidereal_time('apparent', longitude=location.lon)
+
+        self.nodes = nodes
+        self.ra = np.unwrap(np.radians(c.ra.deg))
+        self.dec = c.dec.deg
+        self.lst = np.unwrap(np.radians(lst.deg))
+        self.latitude = location.lat.deg
+
+    def altitude(self, jd):
+        ha = np.degrees(np.interp(jd, self.nodes, self.lst)
+                        - np.interp(jd, self.nodes, self.ra))
+        dec = np.interp(jd, self.nodes, self.dec)
+        return hadec_to_altaz(ha, dec, self.latitude)[1]
+
+def _find_crossings(track, grid, alt, horizon, rising):
+    """
+    Time of the first crossing of horizon in each row of grid.
+
+    The crossing is located by linear interpolation on the grid and
+    refined with one step of regula falsi.
+    """
+    a = alt - horizon
+    if rising:
+        cross = (a[:, :-1] <= 0) & (a[:, 1:] > 0)
+    else:
+        cross = (a[:, :-1] > 0) & (a[:, 1:] <= 0)
+
+    found = cross.any(axis=1)
+    rows = np.arange(grid.shape[0])
+    k = cross.argmax(axis=1)
+    t0 = grid[rows, k]
+    t1 = grid[rows, k + 1]
+    a0 = a[rows, k]
+    a1 = a[rows, k + 1]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = t0 + (t1 - t0) * a0 / (a0 - a1)
+        at = track.altitude(t) - horizon
+        lo_side = np.sign(at) == np.sign(a0)
+        t = np.where(lo_side,
+                     t + (t1 - t) * at / (at - a1),
+                     t0 + (t - t0) * a0 / (a0 - at))
+
+    return np.where(found, t, np.nan)
+
+def compute_events(location, ordinals):
+    """
+    Compute sun and moon events for a range of nights.
+
+    All nights are computed together from one set of sun and moon
+    positions.  The night of a date starts at local mean noon on that
+    date.
+
+    :param location: :class:`astropy.coordinates.EarthLocation` of site.
+    :param ordinals: Consecutive date ordinals of the nights.
+    :returns: Dictionary with an array for each of :data:`EPHEMERIS_EVENTS`.
+    """
+    from astropy.time import Time
+    from astroplan import moon_illumination
+
+    noon = local_noon_jd(np.asarray(ordinals), location.lon.deg)
+    grid = noon[:, np.newaxis] + np.arange(_NGRID) * _GRID_SPACING
+
+    events = {}
+    for body in ('sun', 'moon'):
+        track = _BodyTrack(body, grid[0, 0], grid[-1, -1], location)
+        alt = track.altitude(grid)
+        if body == 'sun':
+            for evening, morning, horizon in SUN_EVENTS:
+                events[evening] = _find_crossings(track, grid, alt,
+                                                  horizon, False)
+                events[morning] = _find_crossings(track, grid, alt,
+                                                  horizon, True)
+        else:
+            events['moonrise'] = _find_crossings(track, grid, alt, 0.0, True)
+            events['moonset'] = _find_crossings(track, grid, alt, 0.0, False)
+
+    events['moon_illumination'] = np.asarray(
+        moon_illumination(Time(noon + 0.5, format='jd')), dtype=float)
+    return events
+
+class EphemerisCache:
+    """
+    Table of sun and moon events for each night over a range of dates.
+
+    The table is computed for a site and can be saved to and loaded
+    from a file so the events only need to be computed once.  Looking
+    up a night is an array index::
+
+        cache = EphemerisCache(fingerprint)
+        cache.update(observer.location, '2020-06-01', 365)
+        cache.save('myobservatory.ephem.npz')
+        dusk = cache.get('2020-06-15')['astronomical_dusk']
+
+    :param str fingerprint: Identifies the site the events are for.
+    """
+
+    def __init__(self, fingerprint=None):
+        #: Identifies the site the events are for
+        self.fingerprint = fingerprint
+        #: Ordinal of first date in table
+        self.day0 = None
+        #: Whether each date in table has been computed
+        self.valid = np.zeros(0, dtype=bool)
+        #: Array of values for each name in :data:`EPHEMERIS_EVENTS`
+        self.events = {k: np.zeros(0) for k in EPHEMERIS_EVENTS}
+
+    @property
+    def ndays(self):
+        return len(self.valid)
+
+    def _resize(self, first, last):
+        """ Grow table to hold ordinals first to last inclusive """
+        if self.day0 is None:
+            self.day0 = first
+            self.valid = np.zeros(last - first + 1, dtype=bool)
+            self.events = {k: np.full(last - first + 1, np.nan)
+                           for k in EPHEMERIS_EVENTS}
+            return
+
+        new0 = min(first, self.day0)
+        new_len = max(last, self.day0 + self.ndays - 1) - new0 + 1
+        off = self.day0 - new0
+
+        valid = np.zeros(new_len, dtype=bool)
+        valid[off:off + self.ndays] = self.valid
+        for k, v in self.events.items():
+            arr = np.full(new_len, np.nan)
+            arr[off:off + self.ndays] = v
+            self.events[k] = arr
+        self.valid = valid
+        self.day0 = new0
+
+    def update(self, location, start, ndays):
+        """
+        Compute any nights in a date range which are not in the table.
+
+        :param location: :class:`astropy.coordinates.EarthLocation` of site.
+        :param start: First date as accepted by :func:`date_to_ordinal`.
+        :param int ndays: Number of nights.
+        :returns: Number of nights computed.
+        """
+        first = date_to_ordinal(start)
+        last = first + ndays - 1
+        self._resize(first, last)
+
+        idx = np.arange(first, last + 1) - self.day0
+        missing = idx[~self.valid[idx]]
+        if len(missing) < 1:
+            return 0
+
+        # compute each run of consecutive missing nights together
+        runs = np.split(missing, np.flatnonzero(np.diff(missing) != 1) + 1)
+        for run in runs:
+            logging.debug(f'EphemerisCache: computing {len(run)} nights')
+            events = compute_events(location, run + self.day0)
+            for k, v in events.items():
+                self.events[k][run] = v
+            self.valid[run] = True
+
+        return len(missing)
+
+    def get(self, date):
+        """
+        Look up the events for a night.
+
+        :param date: Date as accepted by :func:`date_to_ordinal`.
+        :returns: Dictionary of values for :data:`EPHEMERIS_EVENTS` or
+                  None if the night is not in the table.
+        """
+        if self.day0 is None:
+            return None
+        i = date_to_ordinal(date) - self.day0
+        if i < 0 or i >= self.ndays or not self.valid[i]:
+            return None
+        return {k: float(v[i]) for k, v in self.events.items()}
+
+    def save(self, filename):
+        """
+        Save table to a NumPy ``.npz`` file.
+
+        :param str filename: Name of file.
+        """
+        tmp_file = f'{filename}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_file, fingerprint=np.array(self.fingerprint),
+                 day0=np.array(self.day0), valid=self.valid, **self.events)
+        os.replace(tmp_file, filename)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load table saved with :meth:`save`.
+
+        :param str filename: Name of file.
+        :returns: :class:`EphemerisCache` or None if it could not be loaded.
+        """
+        try:
+            with np.load(filename) as d:
+                cache = cls(str(d['fingerprint']))
+                cache.day0 = int(d['day0'])
+                cache.valid = d['valid']
+                cache.events = {k: d[k] for k in EPHEMERIS_EVENTS}
+        except (OSError, KeyError, ValueError):
+            logging.debug(f'EphemerisCache: unable to load {filename}',
+                          exc_info=True)
+            return None
+        return cache
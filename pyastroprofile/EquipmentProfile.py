@@ -94,6 +94,25 @@ class EquipmentProfile(Profile):
         driver: str = 'Not Set'
         #: pier side reporting hint
         pierside_reporting: str = 'Not set'
+        #: Lowest altitude mount may point at in degrees
+        min_altitude: float = None
+        #: Most easterly hour angle mount may reach in degrees (negative)
+        hour_angle_min: float = None
+        #: Most westerly hour angle mount may reach in degrees
+        hour_angle_max: float = None
+        #: Lowest declination mount may reach in degrees
+        dec_min: float = None
+        #: Highest declination mount may reach in degrees
+        dec_max: float = None
+        #: Degrees of hour angle mount may track past the meridian while
+        #: pointing east before it must flip
+        meridian_limit_east: float = None
+        #: Degrees of hour angle before the meridian mount may reach while
+        #: pointing west after a flip
+        meridian_limit_west: float = None
+        #: Zones where the telescope hits the pier as a list of
+        #: [hour angle min, hour angle max, dec min, dec max] in degrees
+        pier_collision_zones: list = field(default_factory=list)
 
     @dataclass
     class FilterWheel(ProfileSection):
@@ -17,46 +17,747 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
+import os
+import struct
+import hashlib
+import logging
 import numpy as np
 
+from pyastroprofile.HorizonFormats import read_horizon
+from pyastroprofile.Coordinates import great_circle_path, wrap180
+
+# extension added to horizon file name for binary cache
+HORIZON_CACHE_EXT = '.cache.npy'
+
+def simplify_horizon(az, alt, tolerance):
+    """
+    Douglas-Peucker simplification of a horizon table.
+
+    Error is measured in altitude at the azimuth of each dropped point
+    so interpolating the simplified table is never more than tolerance
+    degrees from interpolating the original table.  The segment which
+    crosses north is included.
+
+    :param az: Azimuths sorted in [0, 360) degrees.
+    :param alt: Horizon altitudes in degrees.
+    :param float tolerance: Maximum altitude error in degrees.
+    :returns: Sorted indices of the points to keep.
+    """
+    # close the loop so the segment across north is simplified too
+    n = len(az)
+    x = np.append(az, az[0] + 360.0)
+    y = np.append(alt, alt[0])
+
+    keep = np.zeros(n + 1, dtype=bool)
+    keep[0] = True
+    keep[n] = True
+    stack = [(0, n)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+
+        xs = x[i + 1:j]
+        ys = y[i + 1:j]
+        line = y[i] + (y[j] - y[i]) * (xs - x[i]) / (x[j] - x[i])
+        err = np.abs(ys - line)
+        k = int(np.argmax(err))
+        if err[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+
+    return np.flatnonzero(keep[:n])
+
+def horizon_envelope(tables):
+    """
+    Compute the upper envelope of several horizon tables.
+
+    The envelope of piecewise linear horizons is itself piecewise linear
+    with vertices at the vertices of each table plus the points where
+    the highest table changes, so the result is exact.
+
+    :param list tables: List of (azimuths, altitudes) tuples in degrees.
+    :returns: (azimuths, altitudes) of the envelope.
+    """
+    layers = []
+    for az, alt in tables:
+        h = Horizon()
+        h.set_table(az, alt)
+        layers.append(h)
+
+    x = np.unique(np.concatenate([h.horizon_table[0] for h in layers]))
+
+    # add crossings between highest layers until no interval changes
+    # which layer is highest
+    for _ in range(len(layers)):
+        xc = np.append(x, x[0] + 360.0)
+        vals = np.array([h.get_alt(xc) for h in layers])
+        top = np.argmax(vals, axis=0)
+        k = np.flatnonzero(top[:-1] != top[1:])
+        if len(k) < 1:
+            break
+
+        a = top[k]
+        b = top[k + 1]
+        d_left = vals[a, k] - vals[b, k]
+        d_right = vals[a, k + 1] - vals[b, k + 1]
+        t = d_left / (d_left - d_right)
+        new_x = np.mod(xc[k] + t * (xc[k + 1] - xc[k]), 360.0)
+        x = np.unique(np.concatenate((x, new_x)))
+
+    alt = np.max([h.get_alt(x) for h in layers], axis=0)
+    return x, alt
+
 class Horizon:
+    """
+    This class stores the local horizon as a table of altitudes
+    as a function of azimuth.  Both are in degrees and azimuth is
+    measured from north through east.
+
+    Lookups interpolate linearly between the table entries and wrap
+    around at 0/360 degrees.  The query methods accept scalars or
+    NumPy arrays of any shape so large batches of positions can be
+    checked in a single call::
 
-    def __init__(self):
+        hzn = Horizon()
+        hzn.readfile('myhorizon.hrz')
+        mask = hzn.is_above(az_array, alt_array)
+    """
+
+    def __init__(self, tolerance=None):
 
         self.horizon_file = None
         self.horizon_table = None
 
-    def readfile(self, horizon_file):
-        with open(horizon_file, 'r') as f:
-            alt_values = []
-            az_values = []
-            for line in f.readlines():
-                az, alt = line.strip().split()
-                az_values.append(float(az))
-                alt_values.append(float(alt))
+        #: If set the horizon table is simplified to this many degrees
+        #: of altitude error when loaded
+        self.tolerance = tolerance
+
+        # sorted copy of table extended by one point on each end
+        # so interpolation wraps around at 0/360
+        self._interp_az = None
+        self._interp_alt = None
+
+        # (file, mtime_ns, size) for each file the table came from
+        self._layers = None
+
+    def readfile(self, horizon_file, use_cache=True, fmt=None):
+        """
+        Load horizon table from a file.
+
+        The formats supported are listed in
+        :data:`pyastroprofile.HorizonFormats.HORIZON_FORMATS` and are
+        detected automatically unless specified.  Comment and malformed
+        lines are skipped.
+
+        The parsed table is stored in a binary sidecar file next to the
+        horizon file which is memory-mapped on later loads instead of
+        parsing the text again.  The sidecar records the modification time
+        and size of the horizon file and is ignored and rebuilt when they
+        no longer match.
+
+        :param str horizon_file: Name of horizon file.
+        :param bool use_cache: Whether to use the binary sidecar cache.
+        :param str fmt: Format of horizon file or None to detect it.
+        :returns: True on success or None if the file could not be loaded.
+        """
+        table, st = self._load_table(horizon_file, use_cache, fmt)
+        if table is None:
+            return None
+
+        self.set_table(table[:, 0], table[:, 1])
+        self.horizon_file = horizon_file
+        self._layers = [(horizon_file, st.st_mtime_ns, st.st_size)]
+        return True
+
+    def readlayers(self, horizon_files, use_cache=True):
+        """
+        Load several horizon files and use their upper envelope.
+
+        Each file is a layer such as terrain, trees or a temporary
+        obstruction.  The envelope is the highest altitude of any layer
+        at each azimuth and is computed once when the layers are loaded.
+
+        :param list horizon_files: Names of horizon files.
+        :param bool use_cache: Whether to use the binary sidecar cache.
+        :returns: True on success or None if any layer could not be loaded.
+        """
+        tables = []
+        layers = []
+        for horizon_file in horizon_files:
+            table, st = self._load_table(horizon_file, use_cache, None)
+            if table is None:
+                return None
+            tables.append((table[:, 0], table[:, 1]))
+            layers.append((horizon_file, st.st_mtime_ns, st.st_size))
+
+        az, alt = horizon_envelope(tables)
+        self.set_table(az, alt)
+        self.horizon_file = horizon_files
+        self._layers = layers
+        return True
+
+    def refresh(self):
+        """
+        Reload the horizon if any of its files changed since loaded.
+
+        :returns: True if the horizon was reloaded, False if unchanged
+                  or None if reloading failed.
+        """
+        if self._layers is None:
+            return False
+
+        for layer_file, mtime_ns, size in self._layers:
+            try:
+                st = os.stat(layer_file)
+            except OSError:
+                st = None
+            if st is None or st.st_mtime_ns != mtime_ns or st.st_size != size:
+                logging.debug(f'Horizon: {layer_file} changed - reloading')
+                break
+        else:
+            return False
+
+        if isinstance(self.horizon_file, (list, tuple)):
+            return self.readlayers(self.horizon_file)
+        return self.readfile(self.horizon_file)
+
+    def _load_table(self, horizon_file, use_cache, fmt):
+        """ Returns (table, stat result) or (None, None) on failure """
+        try:
+            st = os.stat(horizon_file)
+        except OSError:
+            logging.error(f'Horizon: unable to access {horizon_file}',
+                          exc_info=True)
+            return None, None
+
+        cache_file = horizon_file + HORIZON_CACHE_EXT
+        table = None
+        if use_cache:
+            table = self._read_cache(cache_file, st)
+
+        if table is None:
+            try:
+                table = read_horizon(horizon_file, fmt=fmt)
+            except (OSError, ValueError, KeyError):
+                logging.error(f'Horizon: unable to parse {horizon_file}',
+                              exc_info=True)
+                return None, None
+
+            if len(table) < 1:
+                logging.error(f'Horizon: no horizon points in {horizon_file}')
+                return None, None
+
+            if use_cache:
+                self._write_cache(cache_file, st, table)
+
+        return table, st
+
+    @staticmethod
+    def _read_cache(cache_file, st):
+        # first row holds mtime and size of source as int64 bit patterns
+        try:
+            arr = np.load(cache_file, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+        if arr.ndim != 2 or arr.shape[1] != 2 or arr.shape[0] < 1 \
+           or arr.dtype != np.float64:
+            return None
+
+        key = np.array(arr[0]).view(np.int64)
+        if key[0] != st.st_mtime_ns or key[1] != st.st_size:
+            logging.debug(f'Horizon: cache {cache_file} is stale')
+            return None
+
+        logging.debug(f'Horizon: using cache {cache_file}')
+        return arr[1:]
+
+    @staticmethod
+    def _write_cache(cache_file, st, table):
+        key = np.array([st.st_mtime_ns, st.st_size], dtype=np.int64)
+        arr = np.concatenate((key.view(np.float64)[np.newaxis, :],
+                              np.asarray(table, dtype=np.float64)))
+
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_file, 'wb') as f:
+                np.save(f, arr)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            logging.debug(f'Horizon: unable to write cache {cache_file}',
+                          exc_info=True)
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+
+    @classmethod
+    def from_dem(cls, dem, location, origin, cell_size, tolerance=None,
+                 **kwargs):
+        """
+        Create horizon from a digital elevation model.
+
+        See :func:`pyastroprofile.HorizonDEM.compute_dem_horizon` for a
+        description of the DEM and the keyword arguments.
+
+        :param dem: Elevation array or name of a ``.npy`` file.
+        :param location: :class:`ObservatoryProfile.Location` of observer.
+        :param origin: (latitude, longitude) of element [0, 0] of the DEM.
+        :param cell_size: Grid spacing of the DEM in degrees.
+        :param float tolerance: Simplify horizon to this altitude error.
+        :returns: :class:`Horizon` or None if it could not be computed.
+        """
+        from pyastroprofile.HorizonDEM import compute_dem_horizon
+
+        kwargs.setdefault('altitude', location.altitude)
+        rc = compute_dem_horizon(dem, location.latitude, location.longitude,
+                                 origin, cell_size, **kwargs)
+        if rc is None:
+            return None
+
+        hzn = cls(tolerance=tolerance)
+        hzn.set_table(*rc)
+        return hzn
+
+    @classmethod
+    def from_allsky(cls, frames, model, threshold, tolerance=None, **kwargs):
+        """
+        Create horizon from all-sky camera frames.
+
+        See :func:`pyastroprofile.HorizonAllSky.compute_allsky_horizon`
+        for a description of the keyword arguments.
+
+        :param frames: Iterable of frames as arrays or ``.npy`` names.
+        :param model: :class:`pyastroprofile.HorizonAllSky.FisheyeModel`
+                      of the camera.
+        :param float threshold: Pixel value separating sky from obstruction.
+        :param float tolerance: Simplify horizon to this altitude error.
+        :returns: :class:`Horizon` or None if it could not be computed.
+        """
+        from pyastroprofile.HorizonAllSky import compute_allsky_horizon
+
+        rc = compute_allsky_horizon(frames, model, threshold, **kwargs)
+        if rc is None:
+            return None
+
+        hzn = cls(tolerance=tolerance)
+        hzn.set_table(*rc)
+        return hzn
+
+    def set_table(self, az_values, alt_values):
+        """
+        Set the horizon table from azimuth and altitude values.
+
+        The table is stored sorted by azimuth in the range [0, 360) and
+        simplified if :attr:`tolerance` is set.
+
+        :param az_values: Azimuths in degrees.
+        :param alt_values: Horizon altitudes in degrees.
+        """
+        az = np.mod(np.asarray(az_values, dtype=float), 360.0)
+        alt = np.asarray(alt_values, dtype=float)
+
+        # sort - if the same azimuth appears twice (like 0 and 360)
+        # keep the first occurrence
+        order = np.argsort(az, kind='stable')
+        az = az[order]
+        alt = alt[order]
+        az, idx = np.unique(az, return_index=True)
+        alt = alt[idx]
+
+        if self.tolerance is not None and len(az) > 2:
+            keep = simplify_horizon(az, alt, self.tolerance)
+            logging.debug(f'Horizon: simplified {len(az)} points to '
+                          f'{len(keep)} with tolerance {self.tolerance}')
+            az = az[keep]
+            alt = alt[keep]
+
+        self.horizon_table = (az, alt)
+        self._prepare_interp()
+
+    def fingerprint(self):
+        """
+        Returns a string which changes whenever the horizon table changes.
+        Used to validate data cached for this horizon.
+        """
+        h = hashlib.sha1()
+        if self.horizon_table is not None:
+            h.update(np.ascontiguousarray(self.horizon_table[0]).tobytes())
+            h.update(np.ascontiguousarray(self.horizon_table[1]).tobytes())
+        return h.hexdigest()[:16]
+
+    def simplify(self, tolerance):
+        """
+        Reduce the horizon table to the fewest points which stay within
+        the given altitude error of the current table.
+
+        :param float tolerance: Maximum altitude error in degrees.
+        """
+        self.tolerance = tolerance
+        if self.horizon_table is not None:
+            self.set_table(*self.horizon_table)
 
-            self.horizon_table = (np.array(az_values), np.array(alt_values))
-            self.horizon_file = horizon_file
-            return True
+    def _prepare_interp(self):
+        self._interp_az = None
+        self._interp_alt = None
 
-        # failed
-        return None
+        if self.horizon_table is None:
+            return
+
+        az, alt = self.horizon_table
+        if len(az) < 1:
+            return
+
+        # wrap last point before 0 and first point after 360
+        self._interp_az = np.concatenate(([az[-1] - 360.0], az, [az[0] + 360.0]))
+        self._interp_alt = np.concatenate(([alt[-1]], alt, [alt[0]]))
 
     # makes a 360 x 90 array with a value of 1 below horizon
     # first index is az and second is alt
     def create_horizon_map(self):
-        alt_arr = np.empty((360, 90)).astype(bool)
-        alt_arr.fill(False)
-        for az in range(0, 360):
-            # round up to make sure we dont give false positives
-            # that an object has cleared horizon
-            h_alt = min(90, self.get_alt(az) + 1)
-            alt_arr[az, 0:int(h_alt)] = True
+        az = np.arange(0, 360)
+        # round up to make sure we dont give false positives
+        # that an object has cleared horizon
+        h_alt = np.clip(self.get_alt(az) + 1, 0, 90).astype(int)
+        alt_arr = np.arange(0, 90)[np.newaxis, :] < h_alt[:, np.newaxis]
 
         return alt_arr
 
+    def create_lookup(self, resolution=0.05):
+        """
+        Create a precomputed :class:`HorizonLookup` table.
+
+        :param float resolution: Azimuth bin width in degrees.
+        :returns: :class:`HorizonLookup` or None if no horizon is loaded.
+        """
+        if self._interp_az is None:
+            return None
+        return HorizonLookup(self, resolution=resolution)
+
+    def create_mask(self, az_resolution=0.1, alt_resolution=0.1):
+        """
+        Create a bit-packed :class:`HorizonMask`.
+
+        :param float az_resolution: Azimuth cell size in degrees.
+        :param float alt_resolution: Altitude cell size in degrees.
+        :returns: :class:`HorizonMask` or None if no horizon is loaded.
+        """
+        lut = self.create_lookup(resolution=az_resolution)
+        if lut is None:
+            return None
+        return HorizonMask.from_lookup(lut, alt_resolution=alt_resolution)
+
     def get_alt(self, az):
+        """
+        Return horizon altitude at the given azimuth.
+
+        :param az: Azimuth(s) in degrees - scalar or array.
+        :returns: Horizon altitude(s) in degrees or None if no horizon
+                  is loaded.
+        """
         # interpolate alt
-        if self.horizon_table is None or len(self.horizon_table) < 1:
+        if self._interp_az is None:
             return None
-        return np.interp(az, self.horizon_table[0], self.horizon_table[1])
+        return np.interp(np.mod(az, 360.0), self._interp_az, self._interp_alt)
+
+    def clearance(self, az, alt):
+        """
+        Return how far positions are above the horizon.
+
+        :param az: Azimuth(s) in degrees - scalar or array.
+        :param alt: Altitude(s) in degrees - must broadcast against az.
+        :returns: Altitude minus horizon altitude in degrees (negative
+                  when below the horizon) or None if no horizon is loaded.
+        """
+        h_alt = self.get_alt(az)
+        if h_alt is None:
+            return None
+        return np.asarray(alt, dtype=float) - h_alt
+
+    def is_above(self, az, alt):
+        """
+        Test if positions are above the horizon.
+
+        :param az: Azimuth(s) in degrees - scalar or array.
+        :param alt: Altitude(s) in degrees - must broadcast against az.
+        :returns: Boolean mask which is True where the position is above
+                  the horizon or None if no horizon is loaded.
+        """
+        c = self.clearance(az, alt)
+        if c is None:
+            return None
+        return c > 0
+
+    def slew_obstructed(self, start_az, start_alt, end_az, end_alt,
+                        path='greatcircle', nsamples=64, margin=0.0):
+        """
+        Test if slews pass below the horizon.
+
+        All arguments broadcast against each other so a batch of slews
+        is checked in one call.  Each path is sampled at nsamples evenly
+        spaced points including both ends.
+
+        :param start_az: Starting azimuth(s) in degrees.
+        :param start_alt: Starting altitude(s) in degrees.
+        :param end_az: Ending azimuth(s) in degrees.
+        :param end_alt: Ending altitude(s) in degrees.
+        :param str path: 'greatcircle' for the shortest path on the sky
+                         or 'axis' for an alt-az mount moving both axes
+                         at once with azimuth taking the shorter way round.
+        :param int nsamples: Number of samples along each path.
+        :param float margin: Required clearance above horizon in degrees.
+        :returns: Boolean array which is True where the path dips below
+                  the horizon or None if no horizon is loaded.
+        """
+        if self._interp_az is None:
+            return None
+
+        if path == 'greatcircle':
+            az, alt = great_circle_path(start_az, start_alt,
+                                        end_az, end_alt, nsamples)
+        elif path == 'axis':
+            t = np.linspace(0.0, 1.0, nsamples)
+            start_az, start_alt, end_az, end_alt = np.broadcast_arrays(
+                start_az, start_alt, end_az, end_alt)
+            daz = wrap180(end_az - start_az)
+            dalt = np.asarray(end_alt, dtype=float) - start_alt
+            az = start_az[..., np.newaxis] + daz[..., np.newaxis] * t
+            alt = start_alt[..., np.newaxis] + dalt[..., np.newaxis] * t
+        else:
+            raise ValueError(f'Horizon: unknown slew path {path}')
+
+        return np.any(self.clearance(az, alt) <= margin, axis=-1)
+
+class HorizonLookup:
+    """
+    Precomputed horizon table with a fixed azimuth resolution.
+
+    Each azimuth bin stores the highest horizon altitude found anywhere
+    inside the bin so queries are a single integer index operation and
+    never report a position as clear when the interpolated horizon would
+    block it.
+
+    The stored value over estimates the interpolated horizon by at most
+    :attr:`max_error` degrees, which is the bin width times the steepest
+    slope (degrees of altitude per degree of azimuth) in the horizon table.
+
+    :param horizon: :class:`Horizon` to build the table from.
+    :param float resolution: Azimuth bin width in degrees.
+    """
+
+    def __init__(self, horizon, resolution=0.05):
+        #: Number of azimuth bins
+        self.nbins = int(np.ceil(360.0 / resolution))
+        #: Azimuth bin width in degrees
+        self.resolution = 360.0 / self.nbins
+
+        tab_az = horizon._interp_az
+        tab_alt = horizon._interp_alt
+
+        # max of a piecewise linear function over a bin is at a bin
+        # edge or at one of the table vertices inside the bin
+        edges = np.arange(self.nbins + 1) * self.resolution
+        edge_alt = np.interp(edges, tab_az, tab_alt)
+        alt = np.maximum(edge_alt[:-1], edge_alt[1:])
+        vert_az = tab_az[1:-1]
+        vert_bin = np.minimum((vert_az / self.resolution).astype(int),
+                              self.nbins - 1)
+        np.maximum.at(alt, vert_bin, tab_alt[1:-1])
+
+        #: Horizon altitude for each azimuth bin
+        self.alt = alt
+
+        slopes = np.abs(np.diff(tab_alt) / np.diff(tab_az))
+        #: Upper bound on how far the table exceeds the interpolated horizon
+        self.max_error = float(slopes.max() * self.resolution)
+
+    def _bin(self, az):
+        idx = (np.mod(az, 360.0) / self.resolution).astype(int)
+        # mod() can round up to exactly 360.0
+        return np.minimum(idx, self.nbins - 1)
+
+    def get_alt(self, az):
+        """
+        Return tabulated horizon altitude at the given azimuth.
+
+        :param az: Azimuth(s) in degrees - scalar or array.
+        """
+        return self.alt[self._bin(az)]
+
+    def is_above(self, az, alt):
+        """
+        Test if positions are above the horizon.
+
+        :param az: Azimuth(s) in degrees - scalar or array.
+        :param alt: Altitude(s) in degrees - must broadcast against az.
+        """
+        return np.asarray(alt) > self.alt[self._bin(az)]
+
+
+class HorizonMask:
+    """
+    Bit-packed map of which az/alt cells are blocked by the horizon.
+
+    A cell is marked blocked if any part of it lies below the horizon so
+    the mask never reports a blocked position as clear.  Altitudes cover
+    -90 to 90 degrees.
+
+    The mask is stored as a small header followed by the packed bits.
+    The same layout is used for files and shared memory so other
+    processes can use a published mask without rebuilding it::
+
+        # in the process which builds the mask
+        mask = horizon.create_mask(az_resolution=0.05)
+        shm = mask.publish_shared('observatory_mask')
+
+        # in a worker process
+        mask = HorizonMask.attach_shared('observatory_mask')
+        clear = mask.is_above(az, alt)
+
+    :param buf: Buffer (bytes, memmap or shared memory) holding header
+                and bits.
+    """
+
+    _MAGIC = b'HZNMASK1'
+    _HEADER = struct.Struct('<8sII')
+
+    def __init__(self, buf):
+        magic, n_az, n_alt = self._HEADER.unpack_from(buf, 0)
+        if magic != self._MAGIC:
+            raise ValueError('HorizonMask: buffer does not contain a mask')
+
+        #: Number of azimuth cells
+        self.n_az = n_az
+        #: Number of altitude cells
+        self.n_alt = n_alt
+        #: Azimuth cell size in degrees
+        self.az_resolution = 360.0 / n_az
+        #: Altitude cell size in degrees
+        self.alt_resolution = 180.0 / n_alt
+
+        nbits = (n_az * n_alt + 7) // 8
+        self._bits = np.frombuffer(buf, dtype=np.uint8, count=nbits,
+                                   offset=self._HEADER.size)
+        self._buf = buf
+        self._shm = None
+
+    @classmethod
+    def from_lookup(cls, lookup, alt_resolution=0.1):
+        """
+        Build mask from a :class:`HorizonLookup`.
+
+        :param lookup: :class:`HorizonLookup` defining azimuth cells.
+        :param float alt_resolution: Altitude cell size in degrees.
+        """
+        n_alt = int(np.ceil(180.0 / alt_resolution))
+        alt_lo = -90.0 + np.arange(n_alt) * (180.0 / n_alt)
+        blocked = alt_lo[np.newaxis, :] < lookup.alt[:, np.newaxis]
+        bits = np.packbits(blocked, axis=None)
+
+        header = cls._HEADER.pack(cls._MAGIC, lookup.nbins, n_alt)
+        return cls(bytearray(header + bits.tobytes()))
+
+    @property
+    def nbytes(self):
+        """Size of header and bits in bytes."""
+        return self._HEADER.size + self._bits.size
+
+    def tobytes(self):
+        return bytes(self._buf[:self.nbytes])
+
+    def _index(self, az, alt):
+        i = (np.mod(az, 360.0) / self.az_resolution).astype(int)
+        i = np.minimum(i, self.n_az - 1)
+        j = ((np.asarray(alt, dtype=float) + 90.0) / self.alt_resolution)
+        j = np.clip(j, 0, self.n_alt - 1).astype(int)
+        return i * self.n_alt + j
+
+    def is_blocked(self, az, alt):
+        """
+        Test if positions are in a cell blocked by the horizon.
+
+        :param az: Azimuth(s) in degrees - scalar or array.
+        :param alt: Altitude(s) in degrees - must broadcast against az.
+        """
+        idx = self._index(az, alt)
+        bit = (self._bits[idx >> 3] >> (7 - (idx & 7))) & 1
+        return bit.astype(bool)
+
+    def is_above(self, az, alt):
+        """
+        Test if positions are clear of the horizon.
+
+        :param az: Azimuth(s) in degrees - scalar or array.
+        :param alt: Altitude(s) in degrees - must broadcast against az.
+        """
+        return ~self.is_blocked(az, alt)
+
+    def save(self, filename):
+        """
+        Write mask to a file which can be memory-mapped with :meth:`load`.
+
+        :param str filename: Name of file to write.
+        """
+        with open(filename, 'wb') as f:
+            f.write(self.tobytes())
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Memory-map a mask written by :meth:`save`.
+
+        :param str filename: Name of mask file.
+        """
+        return cls(np.memmap(filename, dtype=np.uint8, mode='r'))
+
+    def publish_shared(self, name=None):
+        """
+        Copy mask into a new shared memory block.
+
+        The caller owns the returned block and should call ``close()``
+        and ``unlink()`` on it when no process needs the mask anymore.
+
+        :param str name: Name of shared memory block or None to have
+                         one generated.
+        :returns: :class:`multiprocessing.shared_memory.SharedMemory`
+        """
+        from multiprocessing import shared_memory
+
+        shm = shared_memory.SharedMemory(name=name, create=True,
+                                         size=self.nbytes)
+        shm.buf[:self.nbytes] = self.tobytes()
+        return shm
+
+    @classmethod
+    def attach_shared(cls, name):
+        """
+        Use a mask published by :meth:`publish_shared` without copying it.
+
+        :param str name: Name of shared memory block.
+        """
+        from multiprocessing import shared_memory
+
+        try:
+            # do not let this process unlink the block when it exits
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # before python 3.13 attaching registers the block with the
+            # resource tracker which unlinks it when this process exits
+            shm = shared_memory.SharedMemory(name=name)
+            if os.name == 'posix':
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, 'shared_memory')
+        mask = cls(shm.buf)
+        mask._shm = shm
+        return mask
+
+    def close(self):
+        """Release shared memory attached with :meth:`attach_shared`."""
+        if self._shm is not None:
+            self._bits = None
+            self._buf = None
+            self._shm.close()
+            self._shm = None
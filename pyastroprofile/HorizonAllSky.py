@@ -0,0 +1,152 @@
+#
+# Derive local horizon from all-sky camera frames
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import logging
+from dataclasses import dataclass
+import numpy as np
+
+@dataclass
+class FisheyeModel:
+    """
+    Describes how an all-sky camera maps the sky onto its image.
+
+    :var center_x: Column of zenith in pixels.
+    :var center_y: Row of zenith in pixels.
+    :var radius: Distance in pixels from zenith to altitude 0.
+    :var projection: One of 'equidistant', 'equisolid', 'stereographic'
+                     or 'orthographic'.
+    :var rotation: Azimuth in degrees at the top of the image.
+    :var flip: False if east is left of north when north is up, which
+               is the view from below the sky.
+    """
+    center_x: float
+    center_y: float
+    radius: float
+    projection: str = 'equidistant'
+    rotation: float = 0.0
+    flip: bool = False
+
+    def _zenith_angle(self, r):
+        """ Zenith angle in radians for radius relative to horizon radius """
+        if self.projection == 'equidistant':
+            return r * np.pi / 2
+        elif self.projection == 'equisolid':
+            return 2 * np.arcsin(np.clip(r * np.sin(np.pi / 4), -1, 1))
+        elif self.projection == 'stereographic':
+            return 2 * np.arctan(r)
+        elif self.projection == 'orthographic':
+            return np.arcsin(np.clip(r, -1, 1))
+        raise ValueError(f'FisheyeModel: unknown projection {self.projection}')
+
+    def pixel_to_altaz(self, x, y):
+        """
+        Convert pixel positions to azimuth and altitude.
+
+        :param x: Pixel column(s).
+        :param y: Pixel row(s).
+        :returns: (azimuth, altitude) in degrees.
+        """
+        dx = np.asarray(x, dtype=float) - self.center_x
+        dy = np.asarray(y, dtype=float) - self.center_y
+        if self.flip:
+            dx = -dx
+
+        r = np.hypot(dx, dy) / self.radius
+        alt = 90.0 - np.degrees(self._zenith_angle(r))
+        az = np.mod(np.degrees(np.arctan2(-dx, -dy)) + self.rotation, 360.0)
+        return az, alt
+
+def _load_frame(frame):
+    if isinstance(frame, (str, os.PathLike)):
+        frame = np.load(frame, mmap_mode='r')
+    frame = np.asarray(frame)
+    if frame.ndim == 3:
+        frame = frame.mean(axis=2)
+    return frame
+
+def compute_allsky_horizon(frames, model, threshold, naz=360,
+                           alt_resolution=0.5, min_fraction=0.5,
+                           sky_is_bright=True):
+    """
+    Compute horizon from a sequence of all-sky camera frames.
+
+    Each frame is thresholded into sky and obstruction and the fraction
+    of frames in which each pixel is obstructed is accumulated.  Frames
+    are loaded one at a time so a long sequence never has to be held in
+    memory.
+
+    Pixels are then grouped into azimuth and altitude cells and the
+    horizon at each azimuth is the top of the run of obstructed cells
+    starting from altitude 0, so isolated objects like wires or birds
+    above a clear cell do not raise the horizon.  Cells without any
+    pixels count as clear.
+
+    :param frames: Iterable of 2D (or 3D color) arrays or ``.npy`` names.
+    :param model: :class:`FisheyeModel` for the camera.
+    :param float threshold: Pixel value separating sky from obstruction.
+    :param int naz: Number of azimuth cells.
+    :param float alt_resolution: Altitude cell size in degrees.
+    :param float min_fraction: Fraction of frames in which a pixel must be
+                               obstructed to count as obstructed.
+    :param bool sky_is_bright: True if sky is brighter than obstructions
+                               such as in daytime frames.
+    :returns: (azimuths, altitudes) in degrees or None if no frames given.
+    """
+    count = None
+    nframes = 0
+    for frame in frames:
+        frame = _load_frame(frame)
+        if sky_is_bright:
+            obstructed = frame < threshold
+        else:
+            obstructed = frame > threshold
+
+        if count is None:
+            count = np.zeros(frame.shape, dtype=np.uint32)
+        count += obstructed
+        nframes += 1
+
+    if nframes < 1:
+        logging.error('compute_allsky_horizon: no frames given')
+        return None
+
+    obstructed = (count >= min_fraction * nframes).ravel()
+
+    y, x = np.indices(count.shape)
+    az, alt = model.pixel_to_altaz(x.ravel(), y.ravel())
+    use = (alt >= 0) & (alt <= 90)
+
+    n_alt = int(np.ceil(90.0 / alt_resolution))
+    az_bin = np.minimum((az[use] * naz / 360.0).astype(int), naz - 1)
+    alt_bin = np.minimum((alt[use] / alt_resolution).astype(int), n_alt - 1)
+    cell = az_bin * n_alt + alt_bin
+
+    total = np.bincount(cell, minlength=naz * n_alt).reshape(naz, n_alt)
+    nobs = np.bincount(cell, weights=obstructed[use],
+                       minlength=naz * n_alt).reshape(naz, n_alt)
+    blocked = (total > 0) & (nobs >= 0.5 * total)
+
+    # number of consecutive blocked cells starting at altitude 0
+    clear = ~blocked
+    first_clear = np.where(clear.any(axis=1), clear.argmax(axis=1), n_alt)
+    h_alt = np.minimum(first_clear * alt_resolution, 90.0)
+
+    h_az = (np.arange(naz) + 0.5) * (360.0 / naz)
+    return h_az, h_alt
@@ -0,0 +1,171 @@
+#
+# Compute local horizon from a digital elevation model
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import logging
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# mean earth radius in meters
+EARTH_RADIUS = 6371000.0
+
+# standard coefficient of terrestrial refraction
+REFRACTION_COEFF = 0.13
+
+# DEM used by worker processes
+_worker_dem = None
+
+def _load_dem(dem):
+    if isinstance(dem, (str, os.PathLike)):
+        return np.load(dem, mmap_mode='r')
+    return np.asarray(dem)
+
+def _init_worker(dem_file):
+    global _worker_dem
+    _worker_dem = np.load(dem_file, mmap_mode='r')
+
+def _sample(dem, row, col):
+    """ Bilinear interpolation of dem - returns NaN outside the dem """
+    nrows, ncols = dem.shape
+    inside = (row >= 0) & (row <= nrows - 1) & (col >= 0) & (col <= ncols - 1)
+    row = np.where(inside, row, 0.0)
+    col = np.where(inside, col, 0.0)
+
+    r0 = np.minimum(row.astype(int), nrows - 2)
+    c0 = np.minimum(col.astype(int), ncols - 2)
+    fr = row - r0
+    fc = col - c0
+
+    z = (dem[r0, c0] * (1 - fr) * (1 - fc)
+         + dem[r0, c0 + 1] * (1 - fr) * fc
+         + dem[r0 + 1, c0] * fr * (1 - fc)
+         + dem[r0 + 1, c0 + 1] * fr * fc)
+    return np.where(inside, z, np.nan)
+
+def _march(dem, az, params):
+    row0, col0, mx, my, eye, dist, drop = params
+
+    az_r = np.radians(az)[:, np.newaxis]
+    row = row0 - np.cos(az_r) * dist / my
+    col = col0 + np.sin(az_r) * dist / mx
+
+    z = _sample(dem, row, col)
+    angle = np.degrees(np.arctan2(z - drop - eye, dist))
+    angle = np.where(np.isnan(angle), -90.0, angle)
+    return angle.max(axis=1)
+
+def _march_worker(az, params):
+    return _march(_worker_dem, az, params)
+
+def compute_dem_horizon(dem, latitude, longitude, origin, cell_size,
+                        altitude=None, height=0.0, naz=3600,
+                        max_distance=None, step=None, processes=None):
+    """
+    Compute the horizon seen from a location on a digital elevation model.
+
+    The DEM is a 2D array of elevations in meters on a regular latitude
+    and longitude grid.  Rows run from north to south and columns from
+    west to east.  Rays are marched outward along each azimuth and the
+    horizon is the highest elevation angle of the terrain along the ray,
+    allowing for curvature of the earth and terrestrial refraction.
+
+    :param dem: Elevation array or name of a ``.npy`` file, which is
+                memory-mapped.  Forked worker processes share an array
+                with this process.  With other start methods workers
+                memory-map the file - an array is written once to a
+                temporary file rather than copied to each worker.
+    :param float latitude: Latitude of observer in degrees.
+    :param float longitude: Longitude of observer in degrees.
+    :param origin: (latitude, longitude) in degrees of the center of
+                   element [0, 0] of the DEM.
+    :param cell_size: Grid spacing in degrees either as a single value
+                      or as (latitude spacing, longitude spacing).
+    :param float altitude: Ground elevation of observer in meters or
+                           None to take it from the DEM.
+    :param float height: Height of telescope above the ground in meters.
+    :param int naz: Number of azimuths to compute.
+    :param float max_distance: Furthest distance examined in meters or
+                               None for the full DEM.
+    :param float step: Distance between samples along a ray in meters or
+                       None for one grid cell.
+    :param int processes: Number of worker processes - None uses all
+                          cores and 1 runs in this process.
+    :returns: (azimuths, altitudes) in degrees.
+    """
+    global _worker_dem
+
+    dem_arr = _load_dem(dem)
+    nrows, ncols = dem_arr.shape
+
+    dlat, dlon = np.broadcast_to(np.asarray(cell_size, dtype=float), (2,))
+    row0 = (origin[0] - latitude) / dlat
+    col0 = (longitude - origin[1]) / dlon
+
+    my = EARTH_RADIUS * np.radians(dlat)
+    mx = EARTH_RADIUS * np.cos(np.radians(latitude)) * np.radians(dlon)
+
+    if altitude is None:
+        altitude = float(_sample(dem_arr, np.array(row0), np.array(col0)))
+        if np.isnan(altitude):
+            logging.error('compute_dem_horizon: location is outside DEM')
+            return None
+    eye = altitude + height
+
+    if step is None:
+        step = min(mx, my)
+    if max_distance is None:
+        max_distance = np.hypot(nrows * my, ncols * mx)
+    dist = np.arange(1, int(max_distance / step) + 1) * step
+    drop = dist**2 * (1 - REFRACTION_COEFF) / (2 * EARTH_RADIUS)
+    params = (row0, col0, mx, my, eye, dist, drop)
+
+    az = np.arange(naz) * (360.0 / naz)
+
+    # limit size of each block of rays to bound memory use
+    nblock = max(1, int(2**22 // len(dist)))
+    blocks = [az[i:i + nblock] for i in range(0, naz, nblock)]
+
+    if processes == 1:
+        alt = [_march(dem_arr, b, params) for b in blocks]
+    elif (not isinstance(dem, (str, os.PathLike))
+          and multiprocessing.get_start_method() == 'fork'):
+        # forked workers inherit the array so nothing is written
+        _worker_dem = dem_arr
+        try:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                alt = list(pool.map(_march_worker, blocks,
+                                    [params] * len(blocks)))
+        finally:
+            _worker_dem = None
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if isinstance(dem, (str, os.PathLike)):
+                dem_file = dem
+            else:
+                dem_file = os.path.join(tmp_dir, 'dem.npy')
+                np.save(dem_file, dem_arr)
+            with ProcessPoolExecutor(max_workers=processes,
+                                     initializer=_init_worker,
+                                     initargs=(dem_file,)) as pool:
+                alt = list(pool.map(_march_worker, blocks,
+                                    [params] * len(blocks)))
+
+    return az, np.concatenate(alt)
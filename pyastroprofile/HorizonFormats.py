@@ -0,0 +1,205 @@
+#
+# Horizon file importers
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import re
+import logging
+from itertools import islice
+import numpy as np
+
+#: Formats understood by :func:`read_horizon`.  For each format the
+#: value is (field delimiter, comment prefixes).  A delimiter of None
+#: means any whitespace.
+HORIZON_FORMATS = {
+    # plain 'az alt' lines as used by pyastroprofile
+    'text': (None, ('#',)),
+    # Stellarium polygonal landscape horizon list
+    'stellarium': (None, ('#', ';')),
+    # N.I.N.A. horizon file
+    'nina': (None, ('#', ';')),
+    # Astro-Physics Command Center horizon export
+    'apcc': (None, ('#', ';', '//')),
+    # comma separated values with optional header row
+    'csv': (',', ('#',)),
+}
+
+# number of lines converted at a time
+CHUNK_LINES = 65536
+
+# number of leading lines examined to detect the format
+_SNIFF_LINES = 50
+
+# only report this many bad lines per file
+_MAX_BAD_LINE_REPORTS = 10
+
+_has_letters = re.compile('[A-Za-z]')
+
+def _strip_comment(line, comments):
+    for c in comments:
+        pos = line.find(c)
+        if pos >= 0:
+            line = line[:pos]
+    return line.strip()
+
+def _split(line, delimiter):
+    if delimiter is None:
+        return line.replace(',', ' ').split()
+    return [x.strip() for x in line.split(delimiter)]
+
+def detect_format(filename, lines=None):
+    """
+    Guess the format of a horizon file.
+
+    :param str filename: Name of horizon file.
+    :param lines: Leading lines of the file or None to read them.
+    :returns: Key into :data:`HORIZON_FORMATS`.
+    """
+    if lines is None:
+        with open(filename, 'r', errors='replace') as f:
+            lines = list(islice(f, _SNIFF_LINES))
+
+    # some tools label their exports in a leading comment
+    header = ' '.join(lines).lower()
+    if 'apcc' in header or 'astro-physics' in header:
+        return 'apcc'
+    if 'n.i.n.a' in header:
+        return 'nina'
+    if 'stellarium' in header:
+        return 'stellarium'
+
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext == '.hrz':
+        return 'nina'
+
+    # look for commas separating fields in the first data line
+    for line in lines:
+        line = _strip_comment(line, ('#', ';'))
+        if len(line) > 0:
+            if ',' in line:
+                return 'csv'
+            break
+
+    if ext == '.txt':
+        return 'stellarium'
+    return 'text'
+
+def _find_columns(lines, delimiter, comments):
+    """
+    Returns (number of leading lines to skip, az column, alt column).
+
+    A header row naming the columns determines their order, otherwise
+    azimuth is assumed to be in the first column.
+    """
+    for i, line in enumerate(lines):
+        line = _strip_comment(line, comments)
+        if len(line) < 1:
+            continue
+
+        if _has_letters.search(line) is None:
+            return 0, 0, 1
+
+        names = [x.lower() for x in _split(line, delimiter)]
+        az_col = 0
+        alt_col = 1
+        for j, name in enumerate(names):
+            if name.startswith('az'):
+                az_col = j
+            elif name.startswith('alt') or name.startswith('el'):
+                alt_col = j
+        return i + 1, az_col, alt_col
+
+    return 0, 0, 1
+
+def _parse_lines(lines, delimiter, comments, cols, filename, nbad):
+    """ Slow path for chunks with malformed lines - skips bad lines """
+    values = []
+    for line in lines:
+        line = _strip_comment(line, comments)
+        if len(line) < 1:
+            continue
+        fields = _split(line, delimiter)
+        try:
+            values.append((float(fields[cols[0]]), float(fields[cols[1]])))
+        except (IndexError, ValueError):
+            nbad += 1
+            if nbad <= _MAX_BAD_LINE_REPORTS:
+                logging.warning(f'read_horizon: skipping bad line in '
+                                f'{filename}: {line}')
+    return np.array(values, dtype=float).reshape(-1, 2), nbad
+
+def read_horizon(filename, fmt=None, chunk_lines=CHUNK_LINES):
+    """
+    Read a horizon file into an array of (azimuth, altitude) rows.
+
+    The file is converted in chunks of lines so memory use is bounded by
+    the chunk size plus the result.  Chunks are converted by NumPy and
+    only a chunk containing malformed lines falls back to line by line
+    parsing, where bad lines are skipped with a warning.
+
+    :param str filename: Name of horizon file.
+    :param str fmt: Key into :data:`HORIZON_FORMATS` or None to detect it.
+    :param int chunk_lines: Number of lines converted at a time.
+    :returns: Array with shape (N, 2) of azimuth and altitude in degrees.
+    """
+    with open(filename, 'r', errors='replace') as f:
+        head = list(islice(f, _SNIFF_LINES))
+
+        if fmt is None:
+            fmt = detect_format(filename, head)
+        delimiter, comments = HORIZON_FORMATS[fmt]
+        logging.debug(f'read_horizon: {filename} format is {fmt}')
+
+        if fmt == 'csv' and not any(',' in _strip_comment(x, comments)
+                                    for x in head):
+            delimiter = None
+
+        nskip, az_col, alt_col = _find_columns(head, delimiter, comments)
+        cols = (az_col, alt_col)
+
+        chunks = []
+        nbad = 0
+        pending = head[nskip:]
+        while True:
+            pending.extend(islice(f, max(0, chunk_lines - len(pending))))
+            if len(pending) < 1:
+                break
+
+            try:
+                arr = np.loadtxt(pending, delimiter=delimiter,
+                                 comments=comments, usecols=cols, ndmin=2)
+            except (ValueError, IndexError):
+                arr, nbad = _parse_lines(pending, delimiter, comments, cols,
+                                         filename, nbad)
+
+            # nan and inf parse as numbers but are not usable points
+            finite = np.all(np.isfinite(arr), axis=1)
+            if not np.all(finite):
+                nbad += int(np.sum(~finite))
+                arr = arr[finite]
+            chunks.append(arr)
+            pending = []
+
+    if nbad > 0:
+        logging.warning(f'read_horizon: skipped {nbad} bad lines in {filename}')
+
+    if len(chunks) < 1:
+        return np.empty((0, 2))
+    return np.concatenate(chunks)
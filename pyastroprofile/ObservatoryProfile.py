@@ -18,14 +18,24 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 import os
+import hashlib
 import logging
+import datetime
 from dataclasses import dataclass
-import astropy.units as u
-from astroplan import Observer
+import time
+import numpy as np
 
 from pyastroprofile.ProfileDict import Profile, ProfileSection
 
-from pyastroprofile.Horizon import Horizon
+from pyastroprofile.Horizon import Horizon, horizon_envelope
+from pyastroprofile.Coordinates import hadec_to_altaz, wrap180
+from pyastroprofile.Ephemeris import EphemerisCache
+from pyastroprofile.Visibility import visibility_windows
+from pyastroprofile.SiderealTime import SiderealTimeTable
+from pyastroprofile.Dome import DomeLookup
+
+# Julian date of 1970-01-01 0h UT
+_UNIX_EPOCH_JD = 2440587.5
 
 class ObservatoryProfile(Profile):
     """
@@ -36,8 +46,9 @@ class ObservatoryProfile(Profile):
                    to store the yaml settings file.
     :param name: The name of the settings file **WITHOUT** the '.yaml' extension.
 
-    Currently the parameter stored is:
+    Currently the parameters stored are:
         * location
+        * dome
 
     Access is done as follows::
 
@@ -64,71 +75,464 @@ class ObservatoryProfile(Profile):
         #: Name of observing location
         obsname: str = None
         #: Latitude in degrees
-        latitud: float = None
+        latitude: float = None
         #: Longitude in degrees
         longitude: float = None
         #: Altitude in meters
         altitude: float = None
         #: Timezone string
         timezone: str = None
-        #: Horizon definition
+        #: Horizon definition - either a file or a list of layer files
+        #: whose upper envelope is used
         horizon_file: str = None
+        #: Simplify horizon to this maximum altitude error in degrees
+        horizon_tolerance: float = None
+
+    @dataclass
+    class Dome(ProfileSection):
+        _sectionname: str = 'dome'
+        #: Radius of dome in meters - 0 if there is no dome
+        radius: float = 0.0
+        #: Width of dome slit in meters
+        slit_width: float = 0.0
+        #: Position of intersection of mount axes east of dome center in meters
+        offset_east: float = 0.0
+        #: Position of intersection of mount axes north of dome center in meters
+        offset_north: float = 0.0
+        #: Position of intersection of mount axes above dome center in meters
+        offset_up: float = 0.0
+        #: Distance from polar axis to optical axis along the declination
+        #: axis in meters - 0 for fork and alt-az mounts
+        gem_offset: float = 0.0
 
     def __init__(self, reldir, name=None):
         super().__init__(reldir, name)
 
         self.add_section(self.Location)
+        self.add_section(self.Dome)
 
         # load horizon file and store so it is not saved in dict
         self._horizon = Horizon()
 
-    def read(self):
+        # set by read(load_horizon=False) until horizon is first used
+        self._horizon_pending = False
+
+        # (location values, Observer) for last observer constructed
+        self._observer_cache = None
+
+        # sun and moon events loaded by ephemeris()
+        self._ephemeris = None
+
+        # table loaded by sidereal_table()
+        self._sidereal_table = None
+
+        # tables loaded by dome_lookup() for each pier side
+        self._dome_lookup = {}
+
+    def read(self, load_horizon=True):
+        """
+        Read profile and horizon.
+
+        :param bool load_horizon: If False the horizon file is not loaded
+                                  until :attr:`horizon` is first used.
+        """
         # load in profile
         super().read()
 
+        self._horizon_pending = False
+        if self.location.horizon_file is not None:
+            if not load_horizon:
+                self._horizon_pending = True
+                return True
+            return self._load_horizon()
+
+    def _load_horizon(self):
+        self._horizon_pending = False
+
         # now try to load horizon file
         if self.location.horizon_file is not None:
             logging.debug('ObservatoryProfile: horizon file = '
                           f'{self.location.horizon_file}')
 
-            # if horizon file specification does not have a leading
-            # directory specification assume it is in the 'astroprofiles/observatories'
-            # directory
-            if os.path.dirname(self.location.horizon_file) == '':
-                hzn_dir = self._get_config_dir()
+            # horizon can be a single file or a list of layers
+            hzn_spec = self.location.horizon_file
+            tolerance = self.location.get('horizon_tolerance')
+            same_tolerance = tolerance == self._horizon.tolerance
+            self._horizon.tolerance = tolerance
+            if self._load_stored_horizon(hzn_spec):
+                return True
+            if isinstance(hzn_spec, (list, tuple)):
+                hzn_files = [self._get_horizon_path(x) for x in hzn_spec]
             else:
-                hzn_dir = ''
+                hzn_files = self._get_horizon_path(hzn_spec)
 
-            hzn_file = os.path.join(hzn_dir, self.location.horizon_file)
-            logging.debug(f'loading horizon file {hzn_file}')
+            # same files already loaded - only reload if one changed
+            if same_tolerance and self._horizon.horizon_file == hzn_files \
+               and self._horizon.refresh() is not None:
+                return True
+
+            if isinstance(hzn_files, list):
+                logging.debug(f'loading horizon layers {hzn_files}')
+                rc = self._horizon.readlayers(hzn_files)
+            else:
+                logging.debug(f'loading horizon file {hzn_files}')
+                rc = self._horizon.readfile(hzn_files)
 
-            rc = self._horizon.readfile(hzn_file)
             if not rc:
                 logging.error('ObservatoryProfile: Unable to load horizon!')
             return rc
 
+    def _load_stored_horizon(self, hzn_spec):
+        # profile storage like a bundle may carry the horizon data itself
+        from pyastroprofile.Storage import get_storage
+
+        layers = hzn_spec if isinstance(hzn_spec, (list, tuple)) else [hzn_spec]
+        storage = get_storage()
+        tables = [storage.horizon_table(self._get_horizon_path(x)) for x in layers]
+        if len(tables) < 1 or any(x is None for x in tables):
+            return False
+
+        logging.debug(f'loading stored horizon {hzn_spec}')
+        if len(tables) > 1:
+            self._horizon.set_table(*horizon_envelope(tables))
+        else:
+            self._horizon.set_table(*tables[0])
+        self._horizon.horizon_file = hzn_spec
+        return True
+
+    def _get_horizon_path(self, hzn_file):
+        # if horizon file specification does not have a leading
+        # directory specification assume it is in the 'astroprofiles/observatories'
+        # directory
+        if os.path.dirname(hzn_file) == '':
+            hzn_dir = self._get_config_dir()
+        else:
+            hzn_dir = ''
+
+        return os.path.join(hzn_dir, hzn_file)
+
+    def slew_obstructed(self, start_ra, start_dec, end_ra, end_dec, time,
+                        path='axis', nsamples=64, margin=0.0):
+        """
+        Test if equatorial mount slews pass below the horizon.
+
+        Coordinates are the equinox of date coordinates the mount works
+        in.  All arguments broadcast against each other so a batch of
+        slews is checked in one call.
+
+        :param start_ra: Starting right ascension(s) in degrees.
+        :param start_dec: Starting declination(s) in degrees.
+        :param end_ra: Ending right ascension(s) in degrees.
+        :param end_dec: Ending declination(s) in degrees.
+        :param time: Time(s) of the slews as :class:`astropy.time.Time`
+                     or anything it accepts.
+        :param str path: 'axis' for both mount axes moving at once
+                         in hour angle and declination or 'greatcircle'
+                         for the shortest path on the sky.
+        :param int nsamples: Number of samples along each path.
+        :param float margin: Required clearance above horizon in degrees.
+        :returns: Boolean array which is True where the path dips below
+                  the horizon or None if no horizon or location is loaded.
+        """
+        if not self._data_complete():
+            return None
+
+        import astropy.units as u
+        from astropy.time import Time
+
+        lst = Time(time).sidereal_time('apparent',
+                                       longitude=self.location.longitude * u.deg)
+        lst = lst.deg
+        start_ha = wrap180(lst - np.asarray(start_ra))
+        end_ha = wrap180(lst - np.asarray(end_ra))
+        lat = self.location.latitude
+
+        if path == 'axis':
+            t = np.linspace(0.0, 1.0, nsamples)
+            start_ha, start_dec, end_ha, end_dec = np.broadcast_arrays(
+                start_ha, start_dec, end_ha, end_dec)
+            ha = start_ha[..., np.newaxis] \
+                + (end_ha - start_ha)[..., np.newaxis] * t
+            dec = start_dec[..., np.newaxis] \
+                + (end_dec - start_dec)[..., np.newaxis] * t
+            az, alt = hadec_to_altaz(ha, dec, lat)
+            clear = self.horizon.clearance(az, alt)
+            if clear is None:
+                return None
+            return np.any(clear <= margin, axis=-1)
+        elif path == 'greatcircle':
+            start_az, start_alt = hadec_to_altaz(start_ha, start_dec, lat)
+            end_az, end_alt = hadec_to_altaz(end_ha, end_dec, lat)
+            return self.horizon.slew_obstructed(start_az, start_alt,
+                                                end_az, end_alt,
+                                                path='greatcircle',
+                                                nsamples=nsamples,
+                                                margin=margin)
+        raise ValueError(f'ObservatoryProfile: unknown slew path {path}')
+
+    def location_fingerprint(self):
+        """
+        Returns a string which changes whenever the latitude, longitude
+        or altitude of the location changes.  Used to validate data
+        cached for this location.
+        """
+        key = (self.location.latitude, self.location.longitude,
+               self.location.altitude)
+        return hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+
+    def _get_ephemeris_filename(self):
+        base, ext = os.path.splitext(self._get_config_filename())
+        return base + '.ephem.npz'
+
+    def ephemeris(self, start=None, ndays=365):
+        """
+        Return table of nightly sun and moon events for this location.
+
+        The table is stored next to the profile file and reused as long
+        as the location does not change.  Only nights not already in the
+        table are computed.
+
+        :param start: First night as a :class:`datetime.date` or
+                      'YYYY-MM-DD' string or None for today.
+        :param int ndays: Number of nights needed.
+        :returns: :class:`pyastroprofile.Ephemeris.EphemerisCache` or None
+                  if the location is incomplete.
+        """
+        observer = self.observer
+        if observer is None:
+            return None
+
+        if start is None:
+            start = datetime.date.today()
+
+        fingerprint = self.location_fingerprint()
+        fname = self._get_ephemeris_filename()
+        cache = self._ephemeris
+        if cache is None or cache.fingerprint != fingerprint:
+            cache = EphemerisCache.load(fname)
+        if cache is None or cache.fingerprint != fingerprint:
+            cache = EphemerisCache(fingerprint)
+
+        if cache.update(observer.location, start, ndays) > 0:
+            try:
+                cache.save(fname)
+            except OSError:
+                logging.warning(f'ObservatoryProfile: unable to save {fname}',
+                                exc_info=True)
+
+        self._ephemeris = cache
+        return cache
+
+    def _get_sidereal_filename(self):
+        base, ext = os.path.splitext(self._get_config_filename())
+        return base + '.lst.npy'
+
+    def sidereal_table(self, start=None, ndays=30, step_minutes=10.0):
+        """
+        Return table of local sidereal time for this location.
+
+        The table is stored next to the profile file and memory-mapped
+        when loaded.  It is recomputed when the longitude changes or it
+        does not cover the time span requested.  A new table starts at
+        0h UT of the start day and covers twice the span requested so
+        it is not recomputed on every call.
+
+        :param start: Start as :class:`astropy.time.Time` or Julian date
+                      or None for now.
+        :param float ndays: Number of days needed.
+        :param float step_minutes: Time between entries if computed.
+        :returns: :class:`pyastroprofile.SiderealTime.SiderealTimeTable` or
+                  None if the longitude is not set.
+        """
+        longitude = self.location.longitude
+        if longitude is None:
+            return None
+
+        if start is None:
+            start = time.time() / 86400.0 + _UNIX_EPOCH_JD
+        start = getattr(start, 'jd', start)
+        end = start + ndays
+
+        fname = self._get_sidereal_filename()
+        for loader in (lambda: self._sidereal_table,
+                       lambda: SiderealTimeTable.load(fname)):
+            table = loader()
+            if table is not None and table.longitude == longitude \
+               and table.covers(start, end):
+                self._sidereal_table = table
+                return table
+
+        logging.debug(f'ObservatoryProfile: computing sidereal table {fname}')
+        start_day = np.floor(start - 0.5) + 0.5
+        table = SiderealTimeTable.compute(longitude, start_day, 2 * ndays + 1,
+                                          step_minutes=step_minutes)
+        try:
+            table.save(fname)
+        except OSError:
+            logging.warning(f'ObservatoryProfile: unable to save {fname}',
+                            exc_info=True)
+
+        self._sidereal_table = table
+        return table
+
+    def _get_dome_filename(self, pierside):
+        base, ext = os.path.splitext(self._get_config_filename())
+        return base + f'.dome-{pierside}.npz'
+
+    def dome_lookup(self, pierside='east', resolution=0.25):
+        """
+        Return table of dome azimuth for each mount position.
+
+        The table is stored next to the profile file and reused until
+        the dome geometry changes.
+
+        :param str pierside: 'east' or 'west' pointing state of the mount.
+        :param float resolution: Grid spacing in degrees if computed.
+        :returns: :class:`pyastroprofile.Dome.DomeLookup` or None if the
+                  dome is not configured.
+        """
+        dome = self.dome
+        if not dome.radius or not dome.slit_width:
+            return None
+        if dome.gem_offset and self.location.latitude is None:
+            return None
+
+        offset = (dome.offset_east, dome.offset_north, dome.offset_up)
+        latitude = self.location.latitude if dome.gem_offset else None
+        key = repr((dome.radius, dome.slit_width, offset, dome.gem_offset,
+                    latitude, pierside, resolution))
+
+        fname = self._get_dome_filename(pierside)
+        for loader in (lambda: self._dome_lookup.get(pierside),
+                       lambda: DomeLookup.load(fname)):
+            lut = loader()
+            if lut is not None and lut.key == key:
+                self._dome_lookup[pierside] = lut
+                return lut
+
+        logging.debug(f'ObservatoryProfile: computing dome table {fname}')
+        lut = DomeLookup.compute(dome.radius, dome.slit_width, offset=offset,
+                                 gem_offset=dome.gem_offset,
+                                 latitude=latitude, pierside=pierside,
+                                 resolution=resolution, key=key)
+        try:
+            lut.save(fname)
+        except OSError:
+            logging.warning(f'ObservatoryProfile: unable to save {fname}',
+                            exc_info=True)
+
+        self._dome_lookup[pierside] = lut
+        return lut
+
+    def dark_period(self, night, darkness='astronomical'):
+        """
+        Start and end of darkness for a night from :meth:`ephemeris`.
+
+        :param night: Date of night as :class:`datetime.date` or
+                      'YYYY-MM-DD' string.
+        :param str darkness: Twilight ending the night - one of 'civil',
+                             'nautical' or 'astronomical'.
+        :returns: (start, end) as Julian dates or (None, None) if location
+                  is incomplete or the night has no darkness.
+        """
+        cache = self.ephemeris(night, 1)
+        if cache is None:
+            return None, None
+
+        events = cache.get(night)
+        start = events[f'{darkness}_dusk']
+        end = events[f'{darkness}_dawn']
+        if np.isnan(start) or np.isnan(end):
+            logging.warning(f'ObservatoryProfile: no {darkness} darkness '
+                            f'on {night}')
+            return None, None
+        return start, end
+
+    def visibility_windows(self, ra, dec, start=None, end=None, night=None,
+                           darkness='astronomical', min_alt=0.0,
+                           step_minutes=5.0):
+        """
+        Compute when targets are above the local horizon.
+
+        The time range is either given by start and end or is the dark
+        part of a night taken from :meth:`ephemeris`.
+
+        :param ra: ICRS right ascension(s) of targets in degrees.
+        :param dec: ICRS declination(s) of targets in degrees.
+        :param start: Start of range as :class:`astropy.time.Time` or
+                      Julian date.
+        :param end: End of range as :class:`astropy.time.Time` or
+                    Julian date.
+        :param night: Date of night as :class:`datetime.date` or
+                      'YYYY-MM-DD' string instead of start and end.
+        :param str darkness: Twilight ending the night - one of 'civil',
+                             'nautical' or 'astronomical'.
+        :param float min_alt: Altitude in degrees targets must also be above.
+        :param float step_minutes: Spacing of time grid in minutes.
+        :returns: :class:`pyastroprofile.Visibility.VisibilityWindows` or
+                  None if location is incomplete or the night has no
+                  darkness.
+        """
+        if not self._data_complete():
+            return None
+
+        if night is not None:
+            start, end = self.dark_period(night, darkness)
+            if start is None:
+                return None
+
+        start = getattr(start, 'jd', start)
+        end = getattr(end, 'jd', end)
+
+        return visibility_windows(ra, dec, start, end,
+                                  self.location.latitude,
+                                  self.location.longitude,
+                                  horizon=self.horizon, min_alt=min_alt,
+                                  step_minutes=step_minutes)
+
+    def _location_key(self):
+        return (self.location.obsname,
+                self.location.latitude,
+                self.location.longitude,
+                self.location.altitude,
+                self.location.timezone)
+
     def _data_complete(self):
-        lst = [self.location.obsname,
-               self.location.latitude,
-               self.location.longitude,
-               self.location.altitude,
-               self.location.timezone]
+        lst = list(self._location_key())
         return (lst.count(None) == 0)
 
+    def _get_observer(self):
+        # the Observer is only rebuilt when a location value changes
+        key = self._location_key()
+        if self._observer_cache is not None and self._observer_cache[0] == key:
+            return self._observer_cache[1]
+
+        if key.count(None) != 0:
+            return None
+
+        import astropy.units as u
+        from astroplan import Observer
+
+        observer = Observer(longitude=self.location.longitude * u.deg,
+                            latitude=self.location.latitude * u.deg,
+                            elevation=self.location.altitude * u.m,
+                            timezone=self.location.timezone,
+                            name=self.location.obsname)
+        self._observer_cache = (key, observer)
+        return observer
+
     def __getattr__(self, attr):
         #logging.info(f'{self.__dict__}')
         # see if they are asking for observer which
         # we construct on the fly from 'real' config items
         if attr == 'observer':
-            if self._data_complete():
-                return Observer(longitude=self.location.longitude * u.deg,
-                                latitude=self.location.latitude * u.deg,
-                                elevation=self.location.altitude * u.m,
-                                timezone=self.location.timezone,
-                                name=self.location.obsname)
-            else:
-                return None
+            return self._get_observer()
         elif attr == 'horizon':
+            if self._horizon_pending:
+                self._load_horizon()
+            else:
+                # cheap stat check which reloads edited horizon files
+                self._horizon.refresh()
             return self._horizon
         else:
             return super().__getattribute__(attr)
@@ -138,10 +542,16 @@ class ObservatoryProfile(Profile):
         # see if they are setting for observer which
         # we break into actual config items
         if attr == 'observer':
+            import astropy.units as u
+
             self.location.obsname = value.name
-            self.location.longitude = value.location.lat.degree
-            self.location.latitude = value.location.lon.degree
-            self.location.altitude = value.location.height.m
-            self.location.timezone = value.timezone
+            # store plain python values so the profile can be written
+            self.location.longitude = float(value.location.lon.degree)
+            self.location.latitude = float(value.location.lat.degree)
+            self.location.altitude = float(value.location.height.to_value(u.m))
+            # zoneinfo names the zone key and pytz names it zone
+            tz = value.timezone
+            self.location.timezone = getattr(tz, 'key', None) \
+                or getattr(tz, 'zone', None) or str(tz)
         else:
             super().__setattr__(attr, value)
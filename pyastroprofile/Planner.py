@@ -0,0 +1,235 @@
+#
+# Season long observability planning
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import hashlib
+import logging
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from pyastroprofile.Horizon import Horizon
+from pyastroprofile.Ephemeris import date_to_ordinal
+from pyastroprofile.Visibility import visibility_windows
+
+# number of nights handed to a worker at once
+CHUNK_NIGHTS = 7
+
+@dataclass
+class SeasonPlan:
+    """
+    Hours each target is above the horizon in darkness each night.
+
+    :var days: Date ordinals of the nights.
+    :var hours: Array (targets x nights) of hours.
+    """
+    days: np.ndarray
+    hours: np.ndarray
+
+def target_keys(ra, dec):
+    """ Key identifying each target by its coordinates """
+    return np.array([hashlib.sha1(f'{r!r},{d!r}'.encode()).hexdigest()[:16]
+                     for r, d in zip(np.asarray(ra, dtype=float).tolist(),
+                                     np.asarray(dec, dtype=float).tolist())])
+
+def _plan_chunk(args):
+    """ Worker computing hours for targets over some nights """
+    (latitude, longitude, table, ra, dec, nights, min_alt,
+     step_minutes) = args
+
+    horizon = Horizon()
+    if table is not None:
+        horizon.set_table(*table)
+
+    hours = np.zeros((len(ra), len(nights)))
+    if len(ra) < 1:
+        return hours
+
+    for i, (dusk, dawn) in enumerate(nights):
+        if np.isnan(dusk) or np.isnan(dawn):
+            continue
+        vis = visibility_windows(ra, dec, dusk, dawn, latitude, longitude,
+                                 horizon=horizon, min_alt=min_alt,
+                                 step_minutes=step_minutes)
+        hours[:, i] = vis.minutes / 60.0
+    return hours
+
+class SeasonPlanner:
+    """
+    Computes the hours targets are observable each night over a season.
+
+    A target is observable when it is above the local horizon during
+    darkness.  Nights are split into chunks computed by a pool of worker
+    processes.  Results are cached in a file next to the observatory
+    profile which is keyed on the location, horizon and planner settings.
+    Within the cache each target is keyed by its coordinates, so later
+    plans only compute nights and targets which are new::
+
+        planner = SeasonPlanner(ap.observatory)
+        plan = planner.plan(ra, dec, '2020-09-01', 120)
+        print(plan.hours[:, 0])
+
+    :param observatory: :class:`ObservatoryProfile` of site.
+    :param str darkness: Twilight bounding the night - one of 'civil',
+                         'nautical' or 'astronomical'.
+    :param float min_alt: Altitude in degrees targets must also be above.
+    :param float step_minutes: Spacing of time grid in minutes.
+    :param int processes: Number of worker processes - None uses all
+                          cores and 1 runs in this process.
+    """
+
+    def __init__(self, observatory, darkness='astronomical', min_alt=0.0,
+                 step_minutes=10.0, processes=None):
+        self.observatory = observatory
+        self.darkness = darkness
+        self.min_alt = min_alt
+        self.step_minutes = step_minutes
+        self.processes = processes
+
+    def _cache_key(self):
+        obs = self.observatory
+        return (f'{obs.location_fingerprint()}-{obs.horizon.fingerprint()}-'
+                f'{self.darkness}-{self.min_alt!r}-{self.step_minutes!r}')
+
+    def _get_cache_filename(self):
+        base, ext = os.path.splitext(self.observatory._get_config_filename())
+        return base + '.plan.npz'
+
+    def _load_cache(self, key):
+        fname = self._get_cache_filename()
+        try:
+            with np.load(fname) as d:
+                if str(d['key']) != key:
+                    logging.debug('SeasonPlanner: cache is for other settings')
+                    return None
+                return d['targets'], d['days'], d['hours']
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _save_cache(self, key, targets, days, hours):
+        fname = self._get_cache_filename()
+        tmp_file = f'{fname}.{os.getpid()}.tmp.npz'
+        try:
+            np.savez(tmp_file, key=np.array(key), targets=targets,
+                     days=days, hours=hours)
+            os.replace(tmp_file, fname)
+        except OSError:
+            logging.warning(f'SeasonPlanner: unable to save {fname}',
+                            exc_info=True)
+
+    def _compute(self, ra, dec, days, ephem):
+        """ Hours for targets over nights using the process pool """
+        obs = self.observatory
+        table = obs.horizon.horizon_table
+        nights = []
+        for d in days.tolist():
+            events = ephem.get(d)
+            nights.append((events[f'{self.darkness}_dusk'],
+                           events[f'{self.darkness}_dawn']))
+
+        chunks = [(obs.location.latitude, obs.location.longitude, table,
+                   ra, dec, nights[i:i + CHUNK_NIGHTS], self.min_alt,
+                   self.step_minutes)
+                  for i in range(0, len(nights), CHUNK_NIGHTS)]
+        if len(chunks) < 1:
+            return np.zeros((len(ra), 0))
+
+        if self.processes == 1 or len(chunks) == 1:
+            result = [_plan_chunk(c) for c in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.processes) as pool:
+                result = list(pool.map(_plan_chunk, chunks))
+        return np.concatenate(result, axis=1)
+
+    def plan(self, ra, dec, start, ndays):
+        """
+        Compute hours observable each night for targets.
+
+        :param ra: ICRS right ascension(s) of targets in degrees.
+        :param dec: ICRS declination(s) of targets in degrees.
+        :param start: First night as :class:`datetime.date` or
+                      'YYYY-MM-DD' string.
+        :param int ndays: Number of nights.
+        :returns: :class:`SeasonPlan` or None if the location is incomplete.
+        """
+        ra = np.atleast_1d(np.asarray(ra, dtype=float))
+        dec = np.atleast_1d(np.asarray(dec, dtype=float))
+        first = date_to_ordinal(start)
+        days = np.arange(first, first + ndays)
+
+        ephem = self.observatory.ephemeris(start, ndays)
+        if ephem is None:
+            return None
+
+        key = self._cache_key()
+        keys = target_keys(ra, dec)
+        cached = self._load_cache(key)
+        if cached is None:
+            c_targets = np.zeros(0, dtype=keys.dtype)
+            c_days = np.zeros(0, dtype=int)
+            c_hours = np.zeros((0, 0))
+        else:
+            c_targets, c_days, c_hours = cached
+
+        # grow cache to hold all requested targets and nights
+        new_t = np.setdiff1d(np.unique(keys), c_targets)
+        new_d = np.setdiff1d(days, c_days)
+        all_targets = np.concatenate((c_targets, new_t))
+        all_days = np.concatenate((c_days, new_d))
+        hours = np.full((len(all_targets), len(all_days)), np.nan)
+        hours[:len(c_targets), :len(c_days)] = c_hours
+
+        t_index = {k: i for i, k in enumerate(all_targets.tolist())}
+        d_index = {d: i for i, d in enumerate(all_days.tolist())}
+        rows = np.array([t_index[k] for k in keys.tolist()], dtype=int)
+        cols = np.array([d_index[d] for d in days.tolist()], dtype=int)
+
+        # nights missing for every requested target are computed for all
+        # of them then targets still missing some nights for the union of
+        # their missing nights - cached targets left out of an earlier
+        # request have gaps at the nights that request added
+        _, first_idx = np.unique(keys, return_index=True)
+        urows = rows[first_idx]
+        missing = np.isnan(hours[urows[:, np.newaxis], cols[np.newaxis, :]])
+        all_missing = np.all(missing, axis=0)
+        computed = False
+        if np.any(all_missing):
+            logging.info(f'SeasonPlanner: computing {np.sum(all_missing)} '
+                         'new nights')
+            h = self._compute(ra[first_idx], dec[first_idx],
+                              days[all_missing], ephem)
+            hours[urows[:, np.newaxis], cols[all_missing][np.newaxis, :]] = h
+            missing[:, all_missing] = False
+            computed = True
+
+        partial = np.any(missing, axis=1)
+        if np.any(partial):
+            need = np.any(missing[partial], axis=0)
+            logging.info(f'SeasonPlanner: computing {np.sum(partial)} '
+                         f'targets for {np.sum(need)} nights')
+            sel = first_idx[partial]
+            h = self._compute(ra[sel], dec[sel], days[need], ephem)
+            hours[urows[partial][:, np.newaxis], cols[need][np.newaxis, :]] = h
+            computed = True
+
+        if computed:
+            self._save_cache(key, all_targets, all_days, hours)
+
+        return SeasonPlan(days=days,
+                          hours=hours[rows[:, np.newaxis], cols[np.newaxis, :]])
@@ -19,11 +19,173 @@
 #
 #
 import os
-import glob
+import copy
+import pickle
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 import yaml
 
+# use the LibYAML C implementation when pyyaml was built with it - the
+# pure python classes give identical results, only slower
+try:
+    from yaml import CSafeLoader as _SafeLoader, CSafeDumper as _SafeDumper
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader, SafeDumper as _SafeDumper
+
+def _yaml_load(stream):
+    """ Parse yaml from a string or file with the fastest safe loader """
+    return yaml.load(stream, Loader=_SafeLoader)
+
+def _yaml_dump(data, stream=None, **kwargs):
+    """ Write yaml with the fastest safe dumper """
+    return yaml.dump(data, stream=stream, Dumper=_SafeDumper, **kwargs)
+
+#: Maximum number of parsed yaml files kept in memory by :func:`read_yaml`
+YAML_CACHE_SIZE = 256
+
+# absolute path -> (mtime_ns, size, parsed data) in least recently used order
+_yaml_cache = OrderedDict()
+_yaml_cache_lock = threading.Lock()
+
+#: Environment variable which enables the on-disk profile cache when set
+#: to a value other than '', '0' or 'no'
+PROFILE_CACHE_ENV = 'PYASTROPROFILE_CACHE'
+
+# None until enable_profile_cache() is called - then overrides environment
+_profile_cache_enabled = None
+
+def enable_profile_cache(enabled=True):
+    """
+    Turn the on-disk compiled profile cache on or off for this process.
+
+    When on, :func:`read_yaml` stores the parsed contents of each file in
+    :func:`get_profile_cache_dir` and later processes load that instead
+    of parsing the yaml.  An entry is used when the size and modification
+    time of the file are unchanged or, failing that, when the file
+    contents hash to the same value.  It can also be turned on by setting
+    the environment variable :data:`PROFILE_CACHE_ENV`.
+
+    :param bool enabled: True to use the cache, False to ignore it and
+                         None to follow the environment variable again.
+    """
+    global _profile_cache_enabled
+    _profile_cache_enabled = enabled
+
+def profile_cache_enabled():
+    if _profile_cache_enabled is not None:
+        return _profile_cache_enabled
+    return os.environ.get(PROFILE_CACHE_ENV, '').lower() not in ('', '0', 'no')
+
+def get_profile_cache_dir():
+    """ Returns the directory holding the on-disk compiled profile cache """
+    return os.path.join(get_base_config_dir(), 'pyastroprofile', 'cache')
+
+def _profile_cache_filename(path):
+    key = hashlib.sha1(path.encode()).hexdigest()[:16]
+    return os.path.join(get_profile_cache_dir(), key + '.pickle')
+
+def _load_compiled(path, st):
+    # returns (parsed data, source bytes or None) - data is None on a miss
+    fname = _profile_cache_filename(path)
+    try:
+        with open(fname, 'rb') as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None, None
+    except Exception:
+        # damaged cache files unpickle to anything or raise anything
+        logging.debug(f'read_yaml: ignoring bad cache {fname}', exc_info=True)
+        return None, None
+    if not isinstance(entry, dict) or 'data' not in entry:
+        return None, None
+    if entry.get('path') != path:
+        return None, None
+    if (entry.get('mtime_ns'), entry.get('size')) == (st.st_mtime_ns, st.st_size):
+        return entry['data'], None
+
+    # touched but possibly unchanged so compare contents
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if hashlib.sha1(raw).hexdigest() == entry.get('sha1'):
+        _save_compiled(path, st, raw, entry['data'])
+        return entry['data'], raw
+    return None, raw
+
+def _save_compiled(path, st, raw, data):
+    fname = _profile_cache_filename(path)
+    entry = {'path': path, 'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+             'sha1': hashlib.sha1(raw).hexdigest(), 'data': data}
+    try:
+        os.makedirs(os.path.dirname(fname), exist_ok=True)
+        tmp_fname = f'{fname}.{os.getpid()}.tmp'
+        with open(tmp_fname, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_fname, fname)
+    except OSError:
+        logging.debug(f'read_yaml: unable to write cache {fname}', exc_info=True)
+
+def read_yaml(filename):
+    """
+    Parse a yaml file.
+
+    The parsed data is kept in memory and reused until the modification
+    time or size of the file changes, so re-reading unchanged profiles
+    does not parse them again.  The least recently used files are
+    dropped when more than :data:`YAML_CACHE_SIZE` are held.  If
+    :func:`enable_profile_cache` is on, new processes load the parsed
+    data from disk instead of parsing the file.
+
+    :param str filename: Name of yaml file.
+    :returns: Parsed data - a copy the caller is free to modify.
+    :raises OSError: If the file cannot be read.
+    """
+    path = os.path.abspath(filename)
+    st = os.stat(path)
+    with _yaml_cache_lock:
+        entry = _yaml_cache.get(path)
+        if entry is not None and entry[:2] == (st.st_mtime_ns, st.st_size):
+            _yaml_cache.move_to_end(path)
+            return copy.deepcopy(entry[2])
+
+    use_compiled = profile_cache_enabled()
+    data = raw = None
+    if use_compiled:
+        data, raw = _load_compiled(path, st)
+
+    if data is None:
+        if raw is None:
+            with open(path, 'rb') as yaml_f:
+                raw = yaml_f.read()
+        data = _yaml_load(raw)
+        if use_compiled:
+            _save_compiled(path, st, raw, data)
+
+    with _yaml_cache_lock:
+        _yaml_cache[path] = (st.st_mtime_ns, st.st_size, data)
+        _yaml_cache.move_to_end(path)
+        while len(_yaml_cache) > YAML_CACHE_SIZE:
+            _yaml_cache.popitem(last=False)
+    return copy.deepcopy(data)
+
+def evict_yaml(filename):
+    """ Drop a file from the :func:`read_yaml` caches - used when writing it """
+    path = os.path.abspath(filename)
+    with _yaml_cache_lock:
+        _yaml_cache.pop(path, None)
+    if profile_cache_enabled():
+        try:
+            os.remove(_profile_cache_filename(path))
+        except OSError:
+            pass
+
+def clear_yaml_cache():
+    """ Drop all files from the :func:`read_yaml` cache """
+    with _yaml_cache_lock:
+        _yaml_cache.clear()
+
 class NoDefaultProfile(Exception):
     """ raised if no default profile exists """
     pass
@@ -40,40 +202,34 @@ def get_base_config_dir():
 
 def find_profiles(loc):
     """ Assumes profiles end with .ini """
-    config_glob = os.path.join(get_base_config_dir(), loc, '*.ini')
-    #print(config_glob)
-    ini_files = sorted(glob.glob(config_glob))
-    return ini_files
+    from pyastroprofile.Storage import get_storage
+
+    config_dir = os.path.join(get_base_config_dir(), loc)
+    return [os.path.join(config_dir, x)
+            for x in get_storage().list(config_dir, '*.ini')]
 
 def set_default_profile(loc, name):
+    from pyastroprofile.Storage import get_storage
+
     config_dir = os.path.join(get_base_config_dir(), loc)
-    def_file = os.path.join(config_dir, 'DEFAULT_PROFILE')
-    with open(def_file, 'w') as f:
-        f.write(f'default={name}\n')
+    return get_storage().set_default(config_dir, name)
 
 # FIXME duplication of method in Profile!
 def get_default_profile(loc):
-    """ See if DEFAULT_PROFILE file exists and check it for the
-        name of the default profile """
+    """ Ask the active storage for the name of the default profile
+        and check the profile exists """
+    from pyastroprofile.Storage import get_storage
+
     config_dir = os.path.join(get_base_config_dir(), loc)
-    def_file = os.path.join(config_dir, 'DEFAULT_PROFILE')
-    def_name = None
-    if os.path.isfile(def_file):
-        with open(def_file, 'r') as f:
-            try:
-                line = f.readline().strip()
-                key, val = line.split('=')
-                if key == 'default':
-                    def_name = val
-            except Exception:
-                logging.error('Error determining default profile', exc_info=True)
+    storage = get_storage()
+    def_name = storage.get_default(config_dir)
 
     # zero length name is same as none
     if def_name is not None and len(def_name) < 1:
         def_name = None
 
     # test if profile exists
-    if not os.path.isfile(def_name):
+    if def_name is not None and not storage.exists(config_dir, def_name):
         def_name = None
     logging.debug(f'Using default profile = {def_name}')
     return def_name
@@ -206,24 +362,12 @@ class Profile:
         return os.path.join(self._get_config_dir(), self._config_filename)
 
     def write(self):
+        from pyastroprofile.Storage import get_storage
+
         # NOTE will overwrite existing without warning!
         logging.debug(f'Configuration files stored in {self._get_config_dir()}')
 
         #self._config.filename = self._get_config_filename()
-
-        # check if config directory exists
-        if not os.path.isdir(self._get_config_dir()):
-            if os.path.exists(self._get_config_dir()):
-                logging.error('write settings: config dir'
-                              f' {self._get_config_dir()}'
-                              f' already exists and is not a directory!')
-                return False
-            else:
-                logging.info('write settings: creating config dir '
-                             f'{self._get_config_dir()}')
-                os.makedirs(self._get_config_dir())
-
-        logging.info(f'write() config filename: {self._get_config_filename()}')
         #logging.info(f'self._config = {self._config}')
 
         # to_dict() must be defined by child class
@@ -237,16 +381,13 @@ class Profile:
         #dataobj = self.to_dict()
         #logging.info(f'to_dict = {dataobj}')
 
-        yaml_f = open(self._get_config_filename(), 'w')
-        yaml.dump(dataobj, stream=yaml_f, default_flow_style=False)
-        yaml_f.close()
-
-        return True
+        return get_storage().write(self._get_config_dir(),
+                                   self._config_filename, dataobj)
 
     def read(self):
-        yaml_f = open(self._get_config_filename(), 'r')
-        d = yaml.safe_load(stream=yaml_f)
-        yaml_f.close()
+        from pyastroprofile.Storage import get_storage
+
+        d = get_storage().read(self._get_config_dir(), self._config_filename)
         #logging.debug(f'read profile is {d}')
 
         # from_dict() must be defined in child
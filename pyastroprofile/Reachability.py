@@ -0,0 +1,144 @@
+#
+# Combined mount limit and horizon reachability
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import numpy as np
+
+from pyastroprofile.Coordinates import altaz_to_hadec
+
+#: Mount fields which affect reachability.
+MOUNT_LIMIT_FIELDS = ('min_altitude', 'hour_angle_min', 'hour_angle_max',
+                      'dec_min', 'dec_max', 'meridian_limit_east',
+                      'meridian_limit_west', 'pier_collision_zones')
+
+def mount_limits_key(mount):
+    """ Hashable value which changes when any mount limit changes """
+    vals = []
+    for f in MOUNT_LIMIT_FIELDS:
+        v = mount.get(f)
+        if isinstance(v, list):
+            v = tuple(tuple(x) for x in v)
+        vals.append(v)
+    return tuple(vals)
+
+def mount_reachable(mount, ha, dec, alt, pierside=None):
+    """
+    Test positions against the mount limits.
+
+    :param mount: :class:`EquipmentProfile.Mount` with the limits.
+    :param ha: Hour angle(s) in degrees.
+    :param dec: Declination(s) in degrees.
+    :param alt: Altitude(s) in degrees.
+    :param str pierside: 'east' or 'west' for the pointing state of a
+                         German equatorial mount limited by the meridian
+                         limits or None if either state may be used.
+    :returns: Boolean array which is True where the mount can point.
+    """
+    ok = np.ones(np.broadcast(ha, dec, alt).shape, dtype=bool)
+
+    def limit(name):
+        return mount.get(name)
+
+    if limit('min_altitude') is not None:
+        ok &= alt >= limit('min_altitude')
+    if limit('hour_angle_min') is not None:
+        ok &= ha >= limit('hour_angle_min')
+    if limit('hour_angle_max') is not None:
+        ok &= ha <= limit('hour_angle_max')
+    if limit('dec_min') is not None:
+        ok &= dec >= limit('dec_min')
+    if limit('dec_max') is not None:
+        ok &= dec <= limit('dec_max')
+
+    for ha_lo, ha_hi, dec_lo, dec_hi in limit('pier_collision_zones') or []:
+        ok &= ~((ha >= ha_lo) & (ha <= ha_hi) & (dec >= dec_lo) & (dec <= dec_hi))
+
+    east = limit('meridian_limit_east')
+    west = limit('meridian_limit_west')
+    east_ok = ha <= east if east is not None else True
+    west_ok = ha >= -west if west is not None else True
+    if pierside == 'east':
+        ok &= east_ok
+    elif pierside == 'west':
+        ok &= west_ok
+    elif pierside is None:
+        ok &= east_ok | west_ok
+    else:
+        raise ValueError(f'mount_reachable: unknown pierside {pierside}')
+
+    return ok
+
+class ReachabilityMask:
+    """
+    Map of the az/alt cells the mount can point at without hitting a
+    mount limit or the local horizon.
+
+    Mount limits are fixed in hour angle and declination and the horizon
+    is fixed in azimuth and altitude, so the combination does not change
+    with time and can be computed once.  A cell is reachable only if
+    all of it is above the horizon and its center is within the mount
+    limits.  Checking positions is then a single table lookup::
+
+        mask = ap.reachability_mask()
+        ok = mask.is_reachable(az, alt)
+
+    :param mount: :class:`EquipmentProfile.Mount` with the limits.
+    :param float latitude: Latitude of site in degrees.
+    :param horizon: :class:`pyastroprofile.Horizon.Horizon` or None.
+    :param str pierside: Pointing state as for :func:`mount_reachable`.
+    :param float az_resolution: Azimuth cell size in degrees.
+    :param float alt_resolution: Altitude cell size in degrees.
+    """
+
+    def __init__(self, mount, latitude, horizon=None, pierside=None,
+                 az_resolution=0.25, alt_resolution=0.25):
+        self.n_az = int(np.ceil(360.0 / az_resolution))
+        self.n_alt = int(np.ceil(180.0 / alt_resolution))
+        self.az_resolution = 360.0 / self.n_az
+        self.alt_resolution = 180.0 / self.n_alt
+
+        az = (np.arange(self.n_az) + 0.5) * self.az_resolution
+        alt_lo = -90.0 + np.arange(self.n_alt) * self.alt_resolution
+        alt = alt_lo + 0.5 * self.alt_resolution
+
+        ha, dec = altaz_to_hadec(az[:, np.newaxis], alt[np.newaxis, :],
+                                 latitude)
+        ok = mount_reachable(mount, ha, dec, alt[np.newaxis, :],
+                             pierside=pierside)
+
+        lut = None if horizon is None else horizon.create_lookup(
+            resolution=self.az_resolution)
+        if lut is not None:
+            ok &= alt_lo[np.newaxis, :] >= lut.alt[:, np.newaxis]
+
+        #: Packed bits (az x alt) set for reachable cells
+        self.bits = np.packbits(ok, axis=None)
+
+    def is_reachable(self, az, alt):
+        """
+        Test if mount can point at positions.
+
+        :param az: Azimuth(s) in degrees - scalar or array.
+        :param alt: Altitude(s) in degrees - must broadcast against az.
+        """
+        i = np.minimum((np.mod(az, 360.0) / self.az_resolution).astype(int),
+                       self.n_az - 1)
+        j = (np.asarray(alt, dtype=float) + 90.0) / self.alt_resolution
+        j = np.clip(j, 0, self.n_alt - 1).astype(int)
+        idx = i * self.n_alt + j
+        return ((self.bits[idx >> 3] >> (7 - (idx & 7))) & 1).astype(bool)
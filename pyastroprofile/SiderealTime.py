@@ -0,0 +1,160 @@
+#
+# Precomputed local sidereal time
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import logging
+import numpy as np
+
+from pyastroprofile.Coordinates import wrap180
+
+# number of leading values in table file holding jd0, step and longitude
+_HEADER_LEN = 3
+
+class SiderealTimeTable:
+    """
+    Table of local apparent sidereal time over a span of time.
+
+    Sidereal time is stored unwrapped (always increasing) at a fixed
+    time step and linearly interpolated, which is accurate to a small
+    fraction of a second of time for steps up to an hour.  Lookups are
+    a couple of array index operations so hour angles and meridian
+    transits of many targets cost about the same as a few arithmetic
+    operations::
+
+        table = ap.observatory.sidereal_table()
+        ha = table.hour_angle(ra, jd)
+        transit_jd = table.meridian_transit(ra, jd)
+
+    :param data: Array holding the header values and table, which can
+                 be a memory-mapped file.
+    """
+
+    def __init__(self, data):
+        self._data = data
+        #: Julian date (UT) of first entry
+        self.jd0 = float(data[0])
+        #: Time between entries in days
+        self.step = float(data[1])
+        #: Longitude in degrees the table is for
+        self.longitude = float(data[2])
+        #: Unwrapped sidereal time in degrees
+        self.lst_table = data[_HEADER_LEN:]
+
+    @property
+    def jd_end(self):
+        """Julian date of last entry."""
+        return self.jd0 + (len(self.lst_table) - 1) * self.step
+
+    def covers(self, start_jd, end_jd):
+        return start_jd >= self.jd0 and end_jd <= self.jd_end
+
+    @classmethod
+    def compute(cls, longitude, start_jd, ndays, step_minutes=10.0):
+        """
+        Compute a table with astropy.
+
+        :param float longitude: Longitude of site in degrees.
+        :param float start_jd: Julian date (UT) of start.
+        :param float ndays: Number of days covered.
+        :param float step_minutes: Time between entries in minutes.
+        """
+        import astropy.units as u
+        from astropy.time import Time
+
+        step = step_minutes / 1440.0
+        n = int(np.ceil(ndays / step)) + 1
+        jd = start_jd + np.arange(n) * step
+        lst = Time(jd, format='jd').sidereal_time('apparent',
+                                                  longitude=longitude * u.deg)
+        lst = np.degrees(np.unwrap(np.radians(lst.deg)))
+
+        data = np.concatenate(([start_jd, step, longitude], lst))
+        return cls(data)
+
+    def save(self, filename):
+        """
+        Save table to a ``.npy`` file which :meth:`load` memory-maps.
+
+        :param str filename: Name of file.
+        """
+        tmp_file = f'{filename}.{os.getpid()}.tmp.npy'
+        np.save(tmp_file, np.asarray(self._data, dtype=np.float64))
+        os.replace(tmp_file, filename)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Memory-map a table saved with :meth:`save`.
+
+        :param str filename: Name of file.
+        :returns: :class:`SiderealTimeTable` or None if it could not be loaded.
+        """
+        try:
+            data = np.load(filename, mmap_mode='r')
+        except (OSError, ValueError):
+            logging.debug(f'SiderealTimeTable: unable to load {filename}',
+                          exc_info=True)
+            return None
+        if data.ndim != 1 or len(data) < _HEADER_LEN + 2:
+            return None
+        return cls(data)
+
+    def _unwrapped(self, jd):
+        x = (np.asarray(jd, dtype=float) - self.jd0) / self.step
+        inside = (x >= 0) & (x <= len(self.lst_table) - 1)
+        x = np.where(inside, x, 0.0)
+        i = np.minimum(x.astype(int), len(self.lst_table) - 2)
+        f = x - i
+        lst = self.lst_table[i] + (self.lst_table[i + 1] - self.lst_table[i]) * f
+        return np.where(inside, lst, np.nan)
+
+    def lst(self, jd):
+        """
+        Local sidereal time in degrees - NaN outside the table.
+
+        :param jd: Julian date(s) (UT).
+        """
+        return np.mod(self._unwrapped(jd), 360.0)
+
+    def hour_angle(self, ra, jd):
+        """
+        Hour angle in degrees in the range [-180, 180).
+
+        :param ra: Right ascension(s) of date in degrees.
+        :param jd: Julian date(s) (UT) - must broadcast against ra.
+        """
+        return wrap180(self._unwrapped(jd) - np.asarray(ra, dtype=float))
+
+    def meridian_transit(self, ra, jd):
+        """
+        Time of next upper meridian transit at or after a time.
+
+        :param ra: Right ascension(s) of date in degrees.
+        :param jd: Julian date(s) (UT) - must broadcast against ra.
+        :returns: Julian date(s) of transit - NaN if not in the table.
+        """
+        now = self._unwrapped(jd)
+        target = now + np.mod(np.asarray(ra, dtype=float) - now, 360.0)
+
+        tab = self.lst_table
+        k = np.searchsorted(tab, np.where(np.isnan(target), tab[0], target))
+        inside = ~np.isnan(target) & (k < len(tab))
+        k = np.clip(k, 1, len(tab) - 1)
+        f = (target - tab[k - 1]) / (tab[k] - tab[k - 1])
+        return np.where(inside, self.jd0 + (k - 1 + f) * self.step, np.nan)
@@ -0,0 +1,183 @@
+#
+# Index of sky cells visible from a site during a night
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import numpy as np
+
+from pyastroprofile.Visibility import target_clearance
+
+class SkyCellIndex:
+    """
+    Records which parts of the sky are visible from a site at each time
+    slice of a night.
+
+    The sky is divided into cells of equal area and roughly square
+    shape.  Declination bands about resolution degrees tall are each
+    split into as many right ascension columns as fit, and the band
+    edges are then adjusted so every cell has exactly the same area.
+    For each time slice one bit per cell records if the center of the
+    cell is above the local horizon and the altitude floor.  Positions
+    within a cell can therefore be misclassified only when within about
+    half a cell of the limit.
+
+    Once built, checking any number of targets is a table lookup with no
+    coordinate transforms::
+
+        index = SkyCellIndex.build(ap.observatory, night='2020-09-01')
+        visible = index.visible(ra, dec)   # targets x time slices
+
+    :param float resolution: Approximate size of cells in degrees.
+    """
+
+    def __init__(self, resolution=1.0):
+        #: Approximate size of cells in degrees
+        self.resolution = resolution
+
+        nbands = max(1, int(round(180.0 / resolution)))
+        edges = np.radians(np.linspace(-90.0, 90.0, nbands + 1))
+        mid = 0.5 * (edges[:-1] + edges[1:])
+        ncols = np.maximum(1, np.round(360.0 * np.cos(mid) / resolution))
+        ncols = ncols.astype(int)
+
+        #: Number of right ascension columns in each band
+        self.ncols = ncols
+        #: Index of first cell in each band
+        self.offsets = np.concatenate(([0], np.cumsum(ncols)))
+        #: sin(declination) of the band edges
+        self.sin_edges = -1.0 + 2.0 * self.offsets / self.offsets[-1]
+
+        #: Julian dates (UT) of the time slices
+        self.jd = np.zeros(0)
+        #: Packed bits (time slices x cells) set for visible cells
+        self.bits = np.zeros((0, (self.ncells + 7) // 8), dtype=np.uint8)
+
+    @property
+    def ncells(self):
+        return int(self.offsets[-1])
+
+    @property
+    def cell_area(self):
+        """Area of each cell in square degrees."""
+        return 4 * np.pi * np.degrees(1.0)**2 / self.ncells
+
+    def cell_of(self, ra, dec):
+        """
+        Cell index containing positions.
+
+        :param ra: ICRS right ascension(s) in degrees.
+        :param dec: ICRS declination(s) in degrees.
+        """
+        s = np.sin(np.radians(dec))
+        band = np.searchsorted(self.sin_edges, s, side='right') - 1
+        band = np.clip(band, 0, len(self.ncols) - 1)
+        n = self.ncols[band]
+        col = np.minimum((np.mod(ra, 360.0) * n / 360.0).astype(int), n - 1)
+        return self.offsets[band] + col
+
+    def cell_centers(self):
+        """Right ascension and declination in degrees of cell centers."""
+        band = np.repeat(np.arange(len(self.ncols)), self.ncols)
+        col = np.arange(self.ncells) - self.offsets[band]
+        s = 0.5 * (self.sin_edges[band] + self.sin_edges[band + 1])
+        ra = (col + 0.5) * 360.0 / self.ncols[band]
+        return ra, np.degrees(np.arcsin(s))
+
+    @classmethod
+    def build(cls, observatory, start=None, end=None, night=None,
+              darkness='astronomical', min_alt=0.0, step_minutes=5.0,
+              resolution=1.0):
+        """
+        Build the index for a site.
+
+        The time range is either given by start and end or is the dark
+        part of a night taken from the ephemeris of the observatory.
+
+        :param observatory: :class:`ObservatoryProfile` of site.
+        :param start: Start of range as :class:`astropy.time.Time` or
+                      Julian date.
+        :param end: End of range as :class:`astropy.time.Time` or
+                    Julian date.
+        :param night: Date of night instead of start and end.
+        :param str darkness: Twilight ending the night.
+        :param float min_alt: Altitude floor in degrees.
+        :param float step_minutes: Spacing of time slices in minutes.
+        :param float resolution: Approximate size of cells in degrees.
+        :returns: :class:`SkyCellIndex` or None if no time range.
+        """
+        if night is not None:
+            start, end = observatory.dark_period(night, darkness)
+            if start is None:
+                return None
+
+        start = getattr(start, 'jd', start)
+        end = getattr(end, 'jd', end)
+        nslices = int(np.ceil((end - start) * 1440.0 / step_minutes - 1e-6))
+        nslices = max(1, nslices)
+        jd = start + np.arange(nslices) * (step_minutes / 1440.0)
+
+        index = cls(resolution=resolution)
+        ra, dec = index.cell_centers()
+        clear = target_clearance(ra, dec, jd, observatory.location.latitude,
+                                 observatory.location.longitude,
+                                 horizon=observatory.horizon,
+                                 min_alt=min_alt)
+        index.jd = jd
+        index.bits = np.packbits(clear.T > 0, axis=1)
+        return index
+
+    def visible(self, ra, dec):
+        """
+        Visibility of targets at every time slice.
+
+        :param ra: ICRS right ascension(s) in degrees.
+        :param dec: ICRS declination(s) in degrees.
+        :returns: Boolean array (targets x time slices).
+        """
+        idx = np.atleast_1d(self.cell_of(ra, dec))
+        bit = (self.bits[:, idx >> 3] >> (7 - (idx & 7))) & 1
+        return bit.T.astype(bool)
+
+    def visible_cells(self, slice_index):
+        """
+        Boolean array over cells of visibility at one time slice.
+
+        :param int slice_index: Index of time slice.
+        """
+        return np.unpackbits(self.bits[slice_index])[:self.ncells].astype(bool)
+
+    def save(self, filename):
+        """
+        Save index to a NumPy ``.npz`` file.
+
+        :param str filename: Name of file.
+        """
+        np.savez(filename, resolution=self.resolution, jd=self.jd,
+                 bits=self.bits)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load index saved with :meth:`save`.
+
+        :param str filename: Name of file.
+        """
+        with np.load(filename) as d:
+            index = cls(resolution=float(d['resolution']))
+            index.jd = d['jd']
+            index.bits = d['bits']
+        return index
@@ -0,0 +1,293 @@
+#
+# Profile storage backends
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import json
+import glob
+import fnmatch
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+from pyastroprofile.ProfileDict import get_base_config_dir, read_yaml
+from pyastroprofile.ProfileDict import evict_yaml, _yaml_dump
+
+#: Name of file holding the default profile of a yaml profile directory
+DEFAULT_PROFILE_FILE = 'DEFAULT_PROFILE'
+
+class ProfileStorage(ABC):
+    """
+    Interface for where profiles are kept.
+
+    A profile is identified by the directory it would be stored in as a
+    file (its location) and its file name.  Data is the dictionary of
+    sections of the profile.
+    """
+
+    @abstractmethod
+    def read(self, location, name):
+        """
+        Read profile data.
+
+        :param str location: Directory of profile.
+        :param str name: Name of profile file.
+        :returns: Profile data.
+        :raises FileNotFoundError: If profile does not exist.
+        """
+
+    @abstractmethod
+    def write(self, location, name, data):
+        """
+        Store profile data replacing any existing profile.
+
+        :param str location: Directory of profile.
+        :param str name: Name of profile file.
+        :param dict data: Profile data.
+        :returns: True on success.
+        """
+
+    @abstractmethod
+    def list(self, location, pattern='*'):
+        """
+        Sorted list of names of profiles in a location.
+
+        :param str location: Directory of profiles.
+        :param str pattern: Shell style pattern names must match.
+        """
+
+    @abstractmethod
+    def exists(self, location, name):
+        """ True if profile exists """
+
+    @abstractmethod
+    def get_default(self, location):
+        """
+        Name of default profile of a location.
+
+        :param str location: Directory of profiles.
+        :returns: Name or None if no default is set.
+        """
+
+    @abstractmethod
+    def set_default(self, location, name):
+        """
+        Set default profile of a location.
+
+        :param str location: Directory of profiles.
+        :param str name: Name of profile or '' to clear the default.
+        :returns: True on success.
+        """
+
+    def horizon_table(self, filename):
+        """
+        Horizon data held by the storage for a horizon file.
+
+        :param str filename: Name of horizon file.
+        :returns: (azimuth, altitude) arrays or None to read the file.
+        """
+        return None
+
+class YamlStorage(ProfileStorage):
+    """
+    Stores each profile as a yaml file - the default.
+    """
+
+    def read(self, location, name):
+        return read_yaml(os.path.join(location, name))
+
+    def write(self, location, name, data):
+        # check if config directory exists
+        if not os.path.isdir(location):
+            if os.path.exists(location):
+                logging.error(f'write settings: config dir {location}'
+                              ' already exists and is not a directory!')
+                return False
+            logging.info(f'write settings: creating config dir {location}')
+            os.makedirs(location)
+
+        fname = os.path.join(location, name)
+        logging.info(f'write() config filename: {fname}')
+        with open(fname, 'w') as yaml_f:
+            _yaml_dump(data, stream=yaml_f, default_flow_style=False)
+        evict_yaml(fname)
+        return True
+
+    def list(self, location, pattern='*'):
+        return sorted(os.path.basename(x)
+                      for x in glob.glob(os.path.join(location, pattern))
+                      if os.path.isfile(x))
+
+    def exists(self, location, name):
+        return os.path.isfile(os.path.join(location, name))
+
+    def get_default(self, location):
+        def_file = os.path.join(location, DEFAULT_PROFILE_FILE)
+        def_name = None
+        if os.path.isfile(def_file):
+            with open(def_file, 'r') as f:
+                try:
+                    line = f.readline().strip()
+                    key, val = line.split('=')
+                    if key == 'default':
+                        def_name = val
+                except Exception:
+                    logging.error('Error determining default profile',
+                                  exc_info=True)
+        return def_name
+
+    def set_default(self, location, name):
+        def_file = os.path.join(location, DEFAULT_PROFILE_FILE)
+        with open(def_file, 'w') as f:
+            f.write(f'default={name}\n')
+        return True
+
+class SqliteStorage(ProfileStorage):
+    """
+    Stores all profiles as rows of one SQLite database.
+
+    Each write is a transaction so readers never see a partially written
+    profile, and listing a location is an index lookup.  Locations inside
+    the base configuration directory are stored relative to it so the
+    database can be copied between computers.  Use :func:`copy_profiles`
+    to move existing yaml profiles into a database.
+
+    :param str filename: Name of database file - created if needed.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS profiles ('
+                               'location TEXT NOT NULL, '
+                               'name TEXT NOT NULL, '
+                               'data TEXT NOT NULL, '
+                               'PRIMARY KEY (location, name)) WITHOUT ROWID')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS defaults ('
+                               'location TEXT PRIMARY KEY, '
+                               'name TEXT NOT NULL)')
+
+    def close(self):
+        self._conn.close()
+
+    @staticmethod
+    def _location_key(location):
+        path = os.path.abspath(location)
+        base = get_base_config_dir()
+        if base is not None:
+            rel = os.path.relpath(path, os.path.abspath(base))
+            if not rel.startswith(os.pardir):
+                return rel.replace(os.sep, '/')
+        return path
+
+    def read(self, location, name):
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM profiles WHERE '
+                                     'location = ? AND name = ?',
+                                     (self._location_key(location),
+                                      name)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f'No profile {name} in {location}')
+        return json.loads(row[0])
+
+    def write(self, location, name, data):
+        try:
+            text = json.dumps(data)
+            with self._lock, self._conn:
+                self._conn.execute('INSERT OR REPLACE INTO profiles '
+                                   '(location, name, data) VALUES (?, ?, ?)',
+                                   (self._location_key(location), name, text))
+        except (TypeError, ValueError, sqlite3.Error):
+            logging.error(f'SqliteStorage: unable to write {name} in '
+                          f'{location}', exc_info=True)
+            return False
+        return True
+
+    def list(self, location, pattern='*'):
+        with self._lock:
+            rows = self._conn.execute('SELECT name FROM profiles WHERE '
+                                      'location = ? ORDER BY name',
+                                      (self._location_key(location),))
+            names = [r[0] for r in rows]
+        return [x for x in names if fnmatch.fnmatchcase(x, pattern)]
+
+    def exists(self, location, name):
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM profiles WHERE '
+                                     'location = ? AND name = ?',
+                                     (self._location_key(location),
+                                      name)).fetchone()
+        return row is not None
+
+    def get_default(self, location):
+        with self._lock:
+            row = self._conn.execute('SELECT name FROM defaults WHERE '
+                                     'location = ?',
+                                     (self._location_key(location),)).fetchone()
+        return None if row is None else row[0]
+
+    def set_default(self, location, name):
+        try:
+            with self._lock, self._conn:
+                self._conn.execute('INSERT OR REPLACE INTO defaults '
+                                   '(location, name) VALUES (?, ?)',
+                                   (self._location_key(location), name))
+        except sqlite3.Error:
+            logging.error(f'SqliteStorage: unable to set default of '
+                          f'{location}', exc_info=True)
+            return False
+        return True
+
+def copy_profiles(source, dest, location, pattern='*'):
+    """
+    Copy profiles in a location between storage backends.
+
+    :param source: :class:`ProfileStorage` to copy from.
+    :param dest: :class:`ProfileStorage` to copy to.
+    :param str location: Directory of profiles.
+    :param str pattern: Shell style pattern names must match.
+    :returns: Number of profiles copied.
+    """
+    ncopied = 0
+    for name in source.list(location, pattern):
+        if dest.write(location, name, source.read(location, name)):
+            ncopied += 1
+
+    def_name = source.get_default(location)
+    if def_name is not None:
+        dest.set_default(location, def_name)
+    return ncopied
+
+_storage = YamlStorage()
+
+def get_storage():
+    """ Returns the :class:`ProfileStorage` profiles are read from and written to """
+    return _storage
+
+def set_storage(storage):
+    """
+    Select where profiles are read from and written to.
+
+    :param storage: :class:`ProfileStorage` or None for the default
+                    :class:`YamlStorage`.
+    """
+    global _storage
+    _storage = storage if storage is not None else YamlStorage()
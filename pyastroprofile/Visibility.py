@@ -0,0 +1,140 @@
+#
+# Target visibility above the local horizon
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+from dataclasses import dataclass
+import numpy as np
+
+from pyastroprofile.Coordinates import (hadec_to_altaz, apparent_radec,
+                                        local_sidereal_time)
+
+# largest number of target x time elements processed at once
+_MAX_BLOCK = 2**21
+
+@dataclass
+class VisibilityWindows:
+    """
+    Times targets are above the horizon during a time range.
+
+    :var jd: Julian dates (UT) of the time grid.
+    :var above: Boolean array (targets x times) which is True when a
+                target is above the horizon.
+    :var rise_jd: First time each target rises above the horizon or the
+                  start of the range if already up - NaN if never up.
+    :var set_jd: Last time each target sets below the horizon or the
+                 end of the range if still up - NaN if never up.
+    :var minutes: Total minutes each target is above the horizon.
+    """
+    jd: np.ndarray
+    above: np.ndarray
+    rise_jd: np.ndarray
+    set_jd: np.ndarray
+    minutes: np.ndarray
+
+def target_clearance(ra, dec, jd, latitude, longitude, horizon=None,
+                     min_alt=0.0):
+    """
+    Height of targets above the local horizon over a grid of times.
+
+    Targets are converted to apparent coordinates once at the middle of
+    the time range and then to alt/az for every time with the sidereal
+    time, so all targets and times are done in a few array operations.
+
+    :param ra: ICRS right ascension(s) of targets in degrees.
+    :param dec: ICRS declination(s) of targets in degrees.
+    :param jd: Julian dates (UT) of the times.
+    :param float latitude: Latitude of site in degrees.
+    :param float longitude: Longitude of site in degrees.
+    :param horizon: :class:`pyastroprofile.Horizon.Horizon` or None.
+    :param float min_alt: Altitude in degrees targets must also be above.
+    :returns: Array (targets x times) of degrees above the horizon.
+    """
+    ra = np.atleast_1d(np.asarray(ra, dtype=float))
+    dec = np.atleast_1d(np.asarray(dec, dtype=float))
+    jd = np.atleast_1d(np.asarray(jd, dtype=float))
+
+    app_ra, app_dec = apparent_radec(ra, dec, 0.5 * (jd[0] + jd[-1]))
+    lst = local_sidereal_time(jd, longitude)
+
+    clear = np.empty((len(ra), len(jd)))
+    nblock = max(1, _MAX_BLOCK // len(jd))
+    for i in range(0, len(ra), nblock):
+        sl = slice(i, i + nblock)
+        ha = lst[np.newaxis, :] - app_ra[sl, np.newaxis]
+        az, alt = hadec_to_altaz(ha, app_dec[sl, np.newaxis], latitude)
+        limit = None if horizon is None else horizon.get_alt(az)
+        if limit is None:
+            limit = min_alt
+        else:
+            limit = np.maximum(limit, min_alt)
+        clear[sl] = alt - limit
+
+    return clear
+
+def visibility_windows(ra, dec, start_jd, end_jd, latitude, longitude,
+                       horizon=None, min_alt=0.0, step_minutes=5.0):
+    """
+    Compute when targets are above the local horizon.
+
+    Rise and set times are interpolated between the grid times.
+
+    :param ra: ICRS right ascension(s) of targets in degrees.
+    :param dec: ICRS declination(s) of targets in degrees.
+    :param float start_jd: Start of time range as Julian date (UT).
+    :param float end_jd: End of time range as Julian date (UT).
+    :param float latitude: Latitude of site in degrees.
+    :param float longitude: Longitude of site in degrees.
+    :param horizon: :class:`pyastroprofile.Horizon.Horizon` or None.
+    :param float min_alt: Altitude in degrees targets must also be above.
+    :param float step_minutes: Spacing of time grid in minutes.
+    :returns: :class:`VisibilityWindows`
+    """
+    step = step_minutes / 1440.0
+    ntimes = max(2, int(np.ceil((end_jd - start_jd) / step)) + 1)
+    jd = np.linspace(start_jd, end_jd, ntimes)
+
+    clear = target_clearance(ra, dec, jd, latitude, longitude,
+                             horizon=horizon, min_alt=min_alt)
+    above = clear > 0
+    up = above.any(axis=1)
+    rows = np.arange(len(clear))
+    dt = jd[1] - jd[0]
+
+    # first rise - interpolate crossing unless up at start
+    k = above.argmax(axis=1)
+    km = np.maximum(k - 1, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frac = clear[rows, km] / (clear[rows, km] - clear[rows, k])
+    rise_jd = np.where(k > 0, jd[km] + frac * dt, jd[0])
+
+    # last set - interpolate crossing unless still up at end
+    k = len(jd) - 1 - above[:, ::-1].argmax(axis=1)
+    kp = np.minimum(k + 1, len(jd) - 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frac = clear[rows, k] / (clear[rows, k] - clear[rows, kp])
+    set_jd = np.where(k < len(jd) - 1, jd[k] + frac * dt, jd[-1])
+
+    rise_jd = np.where(up, rise_jd, np.nan)
+    set_jd = np.where(up, set_jd, np.nan)
+
+    # each grid time represents one step of time
+    minutes = above.sum(axis=1) * (dt * 1440.0)
+    minutes = np.minimum(minutes, (jd[-1] - jd[0]) * 1440.0)
+
+    return VisibilityWindows(jd=jd, above=above, rise_jd=rise_jd,
+                             set_jd=set_jd, minutes=minutes)
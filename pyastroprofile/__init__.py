@@ -0,0 +1,62 @@
+#
+# pyastroprofile package
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Public names are imported on first use so "import pyastroprofile" stays
+# cheap.  astropy and astroplan are only imported by the functions which
+# need them.
+#
+# Classes with the same name as their module (AstroProfile, Horizon, ...)
+# cannot be exported here since importing the module replaces the package
+# attribute - import them from their module as before:
+#
+#     from pyastroprofile.AstroProfile import AstroProfile
+#
+import importlib
+
+# public name -> module it is defined in
+_LAZY_EXPORTS = {
+    'get_astroprofile_base_dir': 'AstroProfile',
+    'get_available_profiles': 'AstroProfile',
+    'DomeLookup': 'Dome',
+    'EphemerisCache': 'Ephemeris',
+    'HorizonLookup': 'Horizon',
+    'HorizonMask': 'Horizon',
+    'FisheyeModel': 'HorizonAllSky',
+    'read_horizon': 'HorizonFormats',
+    'SeasonPlan': 'Planner',
+    'SeasonPlanner': 'Planner',
+    'ReachabilityMask': 'Reachability',
+    'SiderealTimeTable': 'SiderealTime',
+    'SkyCellIndex': 'SkyIndex',
+    'VisibilityWindows': 'Visibility',
+    'visibility_windows': 'Visibility',
+}
+
+__all__ = sorted(_LAZY_EXPORTS)
+
+def __getattr__(name):
+    modname = _LAZY_EXPORTS.get(name)
+    if modname is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{modname}'), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,77 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import os
+
+from pyastroprofile.AstroProfile import AstroProfile, get_astroprofile_base_dir
+from pyastroprofile.EquipmentProfile import EquipmentProfile
+from pyastroprofile.ObservatoryProfile import ObservatoryProfile
+from pyastroprofile.SettingsProfile import SettingsProfile
+
+def create_section(section, name):
+    return section(reldir=os.path.join(get_astroprofile_base_dir(),
+                                       section._conf_rel_dir), name=name)
+
+def make_profiles(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+
+    eq = create_section(EquipmentProfile, 'test_profile')
+    eq.camera.driver = 'CCD Simulator'
+    assert eq.write()
+
+    obs = create_section(ObservatoryProfile, 'test_profile')
+    obs.location.latitude = 40.0
+    obs.location.horizon_file = 'test_horizon.txt'
+    assert obs.write()
+    with open(os.path.join(obs._get_config_dir(), 'test_horizon.txt'), 'w') as f:
+        f.write('0 10\n90 20\n180 30\n270 20\n')
+
+    settings = create_section(SettingsProfile, 'test_profile')
+    settings.platesolve.pixelscale = 1.5
+    assert settings.write()
+
+    assert AstroProfile().create_reference('test_profile', 'test_profile',
+                                           'test_profile', 'test_profile')
+
+def test_read_eager(tmp_path, monkeypatch):
+    make_profiles(tmp_path, monkeypatch)
+    ap = AstroProfile()
+    assert ap.read('test_profile')
+    assert ap._pending == {}
+    assert ap.observatory._horizon.horizon_table is not None
+    assert ap.settings.platesolve.pixelscale == 1.5
+
+def test_read_lazy(tmp_path, monkeypatch):
+    make_profiles(tmp_path, monkeypatch)
+    ap = AstroProfile()
+    assert ap.read('test_profile', lazy=True)
+    assert ap._equipment is None and ap._observatory is None
+
+    assert ap.equipment.camera.driver == 'CCD Simulator'
+    assert ap._observatory is None and ap._settings is None
+
+    assert ap.observatory.location.latitude == 40.0
+    assert ap.observatory._horizon.horizon_table is None
+    assert ap.observatory.horizon.get_alt(90.0) == 20.0
+    assert ap._settings is None
+
+    # assigning replaces a profile which was never read
+    ap.settings = None
+    assert ap.settings is None and ap._pending == {}
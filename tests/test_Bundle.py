@@ -0,0 +1,98 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import os
+import shutil
+import pytest
+
+from pyastroprofile.AstroProfile import AstroProfile, get_astroprofile_base_dir
+from pyastroprofile.AstroProfile import get_available_profiles
+from pyastroprofile.Bundle import BundleStorage, export_bundle
+from pyastroprofile.EquipmentProfile import EquipmentProfile
+from pyastroprofile.ObservatoryProfile import ObservatoryProfile
+from pyastroprofile.ProfileDict import get_default_profile, set_default_profile
+from pyastroprofile.SettingsProfile import SettingsProfile
+from pyastroprofile.Storage import set_storage
+
+def create_section(section, name):
+    return section(reldir=os.path.join(get_astroprofile_base_dir(),
+                                       section._conf_rel_dir), name=name)
+
+def make_profiles():
+    eq = create_section(EquipmentProfile, 'test_equipment')
+    eq.camera.driver = 'CCD Simulator'
+    assert eq.write()
+
+    obs = create_section(ObservatoryProfile, 'test_observatory')
+    obs.location.latitude = 40.0
+    obs.location.horizon_file = ['trees.txt', 'house.txt']
+    assert obs.write()
+    obs_dir = obs._get_config_dir()
+    with open(os.path.join(obs_dir, 'trees.txt'), 'w') as f:
+        f.write('0 10\n90 20\n180 30\n270 20\n')
+    with open(os.path.join(obs_dir, 'house.txt'), 'w') as f:
+        f.write('0 0\n90 40\n180 0\n270 0\n')
+    # sidecar files are left out
+    with open(obs._get_ephemeris_filename(), 'wb') as f:
+        f.write(b'PK\x03\x04\xff\xfe')
+
+    settings = create_section(SettingsProfile, 'test_settings')
+    settings.platesolve.pixelscale = 1.5
+    assert settings.write()
+
+    assert AstroProfile().create_reference('test_profile', 'test_equipment',
+                                           'test_observatory', 'test_settings')
+
+def test_bundle(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    make_profiles()
+    set_default_profile(get_astroprofile_base_dir(), 'test_profile.yaml')
+    bundle_file = str(tmp_path / 'profiles.bundle')
+    assert export_bundle(bundle_file) == 4
+
+    # bundle is used on its own
+    shutil.rmtree(get_astroprofile_base_dir())
+    bundle = BundleStorage(bundle_file)
+    set_storage(bundle)
+    try:
+        assert get_available_profiles() == ['test_profile']
+        assert get_default_profile(get_astroprofile_base_dir()) == \
+            'test_profile.yaml'
+
+        ap = AstroProfile()
+        assert ap.read('test_profile', lazy=True)
+        assert ap.equipment.camera.driver == 'CCD Simulator'
+        assert ap.settings.platesolve.pixelscale == 1.5
+        hzn = ap.observatory.horizon
+        assert hzn.get_alt(90.0) == 40.0
+        assert hzn.get_alt(180.0) == 30.0
+
+        assert not ap.equipment.write()
+        assert not set_default_profile(get_astroprofile_base_dir(), '')
+    finally:
+        set_storage(None)
+        bundle.close()
+
+def test_not_a_bundle(tmp_path):
+    fname = str(tmp_path / 'junk')
+    with open(fname, 'wb') as f:
+        f.write(b'\0' * 64)
+    with pytest.raises(ValueError):
+        BundleStorage(fname)
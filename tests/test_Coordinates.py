@@ -0,0 +1,42 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import numpy as np
+
+from pyastroprofile.Coordinates import (hadec_to_altaz, altaz_to_hadec,
+                                        great_circle_path)
+
+def test_hadec_roundtrip():
+    rng = np.random.default_rng(4)
+    ha = rng.uniform(-180, 180, 1000)
+    dec = rng.uniform(-89, 89, 1000)
+    az, alt = hadec_to_altaz(ha, dec, 40.0)
+    ha2, dec2 = altaz_to_hadec(az, alt, 40.0)
+    assert np.allclose(ha2, ha) and np.allclose(dec2, dec)
+
+def test_meridian():
+    az, alt = hadec_to_altaz(0.0, 10.0, 40.0)
+    assert np.isclose(az, 180.0) and np.isclose(alt, 60.0)
+    az, alt = hadec_to_altaz(0.0, 90.0, 40.0)
+    assert np.isclose(alt, 40.0)
+
+def test_great_circle_midpoint():
+    az, alt = great_circle_path(90.0, 0.0, 270.0, 0.1, 3)
+    assert np.isclose(alt[1], 90.0, atol=0.1)
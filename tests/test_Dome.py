@@ -0,0 +1,94 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import os
+import numpy as np
+
+from pyastroprofile.Dome import DomeLookup, dome_azimuth
+from pyastroprofile.ObservatoryProfile import ObservatoryProfile
+
+def test_dome_azimuth_geometry():
+    # centered mount follows the telescope
+    az = np.array([0.0, 45.0, 200.0])
+    dome_az, tol = dome_azimuth(az, np.array([0.0, 30.0, 60.0]), 2.0, 1.0)
+    assert np.allclose(dome_az, az)
+    assert np.allclose(tol, np.degrees(np.arcsin(0.5 / (2.0 * np.cos(
+        np.radians([0.0, 30.0, 60.0]))))))
+
+    # mount 1m east of center pointing north leaves the dome at 30 deg
+    dome_az, tol = dome_azimuth(0.0, 0.0, 2.0, 1.0, offset=(1.0, 0.0, 0.0))
+    assert np.isclose(dome_az, 30.0)
+
+    # slit covers zenith for any dome azimuth
+    dome_az, tol = dome_azimuth(0.0, 90.0, 2.0, 1.0)
+    assert tol == 180.0
+
+    # GEM offset moves the optical axis to opposite sides of the pier
+    east, _ = dome_azimuth(90.0, 10.0, 2.0, 1.0, gem_offset=0.5,
+                           latitude=35.0, pierside='east')
+    west, _ = dome_azimuth(90.0, 10.0, 2.0, 1.0, gem_offset=0.5,
+                           latitude=35.0, pierside='west')
+    assert west < 90.0 < east
+
+def test_dome_lookup(tmp_path):
+    obs = ObservatoryProfile(reldir=None, name='test_observatory')
+    obs._config_reldir = str(tmp_path)
+    assert obs.dome_lookup() is None
+
+    obs.location.latitude = 35.8
+    obs.dome.radius = 2.5
+    obs.dome.slit_width = 1.0
+    obs.dome.offset_north = 0.3
+    obs.dome.gem_offset = 0.4
+    lut = obs.dome_lookup(resolution=1.0)
+    assert os.path.isfile(obs._get_dome_filename('east'))
+    assert obs.dome_lookup(resolution=1.0) is lut
+
+    az = np.array([10.0, 123.0, 359.6])
+    alt = np.array([20.0, 45.0, 89.6])
+    dome_az, tol = lut.lookup(az, alt)
+    exact, exact_tol = dome_azimuth(np.rint(az) % 360, np.rint(alt), 2.5, 1.0,
+                                    offset=(0.0, 0.3, 0.0), gem_offset=0.4,
+                                    latitude=35.8)
+    assert np.allclose(dome_az, exact, atol=1e-3)
+    assert np.allclose(tol, exact_tol, atol=1e-3)
+
+    # reloaded from file and recomputed when geometry changes
+    obs2 = ObservatoryProfile(reldir=None, name='test_observatory')
+    obs2._config_reldir = str(tmp_path)
+    obs2.location.latitude = 35.8
+    obs2.dome = obs.dome
+    lut2 = obs2.dome_lookup(resolution=1.0)
+    assert lut2.key == lut.key and np.array_equal(lut2.dome_az, lut.dome_az)
+    obs2.dome.radius = 3.0
+    assert obs2.dome_lookup(resolution=1.0).key != lut.key
+
+def test_dome_lookup_uneven_resolution():
+    # 0.7 deg does not divide 90 or 360 evenly
+    lut = DomeLookup.compute(2.5, 1.0, offset=(0.5, 0.0, 0.0), resolution=0.7)
+    step = 90.0 / round(90.0 / 0.7)
+    for az, alt in [(45.0, 89.0), (200.0, 30.0), (359.0, 1.0)]:
+        node_az = round(az / step) * step
+        node_alt = round(alt / step) * step
+        exact, exact_tol = dome_azimuth(node_az, node_alt, 2.5, 1.0,
+                                        offset=(0.5, 0.0, 0.0))
+        dome_az, tol = lut.lookup(az, alt)
+        assert np.isclose(dome_az, exact, atol=1e-3)
+        assert np.isclose(tol, exact_tol, atol=1e-3)
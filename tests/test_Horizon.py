@@ -0,0 +1,185 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import os
+import sys
+import subprocess
+import numpy as np
+
+from pyastroprofile.Horizon import Horizon, HorizonMask, HORIZON_CACHE_EXT
+
+def make_horizon():
+    hzn = Horizon()
+    hzn.set_table([10, 90, 180, 270, 350], [20, 10, 30, 10, 0])
+    return hzn
+
+def test_get_alt_wraps():
+    hzn = make_horizon()
+    # halfway between 350 (0 deg) and 10 (20 deg) across north
+    assert np.isclose(hzn.get_alt(0.0), 10.0)
+    assert np.isclose(hzn.get_alt(360.0), 10.0)
+    assert np.isclose(hzn.get_alt(-5.0), 5.0)
+    assert np.isclose(hzn.get_alt(135.0), 20.0)
+
+def test_batch_queries():
+    hzn = make_horizon()
+    az = np.array([[0.0, 90.0], [180.0, 355.0]])
+    alt = np.array([[11.0, 9.0], [30.0, 7.5]])
+    assert np.allclose(hzn.clearance(az, alt), [[1.0, -1.0], [0.0, 2.5]])
+    assert np.array_equal(hzn.is_above(az, alt), [[True, False], [False, True]])
+
+def test_no_table():
+    hzn = Horizon()
+    assert hzn.get_alt(10.0) is None
+    assert hzn.is_above(10.0, 20.0) is None
+
+def test_horizon_map():
+    hzn = make_horizon()
+    hmap = hzn.create_horizon_map()
+    assert hmap.shape == (360, 90)
+    assert hmap[135, 20] and not hmap[135, 21]
+    assert hmap[350, 0] and not hmap[350, 1]
+
+def test_lookup_error_bound():
+    hzn = make_horizon()
+    lut = hzn.create_lookup(resolution=0.5)
+    az = np.random.default_rng(1).uniform(-360, 720, 100000)
+    diff = lut.get_alt(az) - hzn.get_alt(az)
+    assert diff.min() >= 0
+    assert diff.max() <= lut.max_error + 1e-9
+    assert not np.any(lut.is_above(az, hzn.get_alt(az)))
+
+def test_mask_roundtrip(tmp_path):
+    hzn = make_horizon()
+    mask = hzn.create_mask(az_resolution=0.5, alt_resolution=0.5)
+    az = np.random.default_rng(2).uniform(0, 360, 10000)
+    alt = hzn.get_alt(az)
+    assert np.all(mask.is_blocked(az, alt))
+    assert np.all(mask.is_above(az, alt + 1.0 + mask.alt_resolution))
+
+    fname = str(tmp_path / 'mask.bin')
+    mask.save(fname)
+    loaded = HorizonMask.load(fname)
+    assert np.array_equal(loaded.is_blocked(az, alt + 1.0),
+                          mask.is_blocked(az, alt + 1.0))
+
+    shm = mask.publish_shared()
+    try:
+        shared = HorizonMask.attach_shared(shm.name)
+        assert np.array_equal(shared.is_blocked(az, alt + 1.0),
+                              mask.is_blocked(az, alt + 1.0))
+        shared.close()
+
+        # another process attaching and exiting leaves the block in place
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [root,
+                                                          env.get('PYTHONPATH')]))
+        code = ('from pyastroprofile.Horizon import HorizonMask\n'
+                f'mask = HorizonMask.attach_shared({shm.name!r})\n'
+                'print(mask.nbytes)\n'
+                'mask.close()\n')
+        out = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                             capture_output=True, text=True)
+        assert int(out.stdout) == mask.nbytes
+        assert 'leaked' not in out.stderr
+
+        shared = HorizonMask.attach_shared(shm.name)
+        assert np.array_equal(shared.is_blocked(az, alt + 1.0),
+                              mask.is_blocked(az, alt + 1.0))
+        shared.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+def test_readfile_cache(tmp_path):
+    fname = str(tmp_path / 'horizon.hrz')
+    with open(fname, 'w') as f:
+        f.write('0 10\n90 20\n180 5\n270 15\n')
+
+    hzn = Horizon()
+    assert hzn.readfile(fname)
+    assert os.path.isfile(fname + HORIZON_CACHE_EXT)
+    assert np.isclose(hzn.get_alt(45.0), 15.0)
+
+    # cached load matches parse
+    hzn2 = Horizon()
+    assert hzn2.readfile(fname)
+    assert np.array_equal(hzn2.horizon_table[1], hzn.horizon_table[1])
+
+    # changing source invalidates cache
+    with open(fname, 'w') as f:
+        f.write('0 30\n90 30\n180 30\n270 30\n')
+    os.utime(fname, ns=(0, 12345))
+    assert hzn2.readfile(fname)
+    assert np.isclose(hzn2.get_alt(45.0), 30.0)
+
+def test_simplify_error_bound():
+    az = np.linspace(0, 360, 3600, endpoint=False)
+    alt = 10 + 5 * np.sin(np.radians(3 * az)) + np.where(az > 200, 8, 0)
+    dense = Horizon()
+    dense.set_table(az, alt)
+    simple = Horizon(tolerance=0.1)
+    simple.set_table(az, alt)
+    assert len(simple.horizon_table[0]) < len(az) / 10
+
+    test_az = np.random.default_rng(3).uniform(0, 360, 100000)
+    diff = np.abs(simple.get_alt(test_az) - dense.get_alt(test_az))
+    assert diff.max() <= 0.1 + 1e-9
+
+def test_layers_envelope(tmp_path):
+    terrain = str(tmp_path / 'terrain.hrz')
+    trees = str(tmp_path / 'trees.hrz')
+    with open(terrain, 'w') as f:
+        f.write('0 10\n180 10\n')
+    with open(trees, 'w') as f:
+        f.write('0 0\n90 20\n180 0\n')
+
+    hzn = Horizon()
+    assert hzn.readlayers([terrain, trees])
+    az = np.linspace(0, 360, 7201)
+    expected = np.maximum(10, np.interp(az, [0, 90, 180, 360], [0, 20, 0, 0]))
+    assert np.allclose(hzn.get_alt(az), expected)
+    assert not hzn.refresh()
+
+    with open(trees, 'w') as f:
+        f.write('0 0\n90 40\n180 0\n')
+    os.utime(trees, ns=(0, 12345))
+    assert hzn.refresh()
+    assert np.isclose(hzn.get_alt(90.0), 40.0)
+
+def test_slew_obstructed():
+    hzn = Horizon()
+    # wall 30 deg high between az 170 and 190
+    hzn.set_table([0, 169, 170, 190, 191], [0, 0, 30, 30, 0])
+
+    start_az = np.array([90.0, 90.0, 160.0])
+    start_alt = np.array([20.0, 20.0, 20.0])
+    end_az = np.array([269.0, 0.0, 200.0])
+    end_alt = np.array([20.0, 20.0, 50.0])
+
+    rc = hzn.slew_obstructed(start_az, start_alt, end_az, end_alt, path='axis')
+    assert np.array_equal(rc, [True, False, True])
+
+    # great circles arc upward and clear the wall
+    rc = hzn.slew_obstructed(start_az, start_alt, end_az, end_alt)
+    assert np.array_equal(rc, [False, False, False])
+    rc = hzn.slew_obstructed(175.0, 40.0, 185.0, 10.0)
+    assert rc
@@ -0,0 +1,49 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import numpy as np
+
+from pyastroprofile.Horizon import Horizon
+from pyastroprofile.HorizonAllSky import FisheyeModel
+
+def test_pixel_to_altaz():
+    model = FisheyeModel(center_x=100, center_y=100, radius=90)
+    az, alt = model.pixel_to_altaz([100, 100, 10, 100], [100, 10, 100, 145])
+    assert np.allclose(alt, [90, 0, 0, 45])
+    assert np.allclose(az[1:], [0, 90, 180])
+
+def test_obstruction_in_east(tmp_path):
+    model = FisheyeModel(center_x=100, center_y=100, radius=90)
+    y, x = np.indices((201, 201))
+    az, alt = model.pixel_to_altaz(x, y)
+
+    # bright sky with dark building up to 20 deg between az 60 and 120
+    frame = np.full((201, 201), 200.0)
+    frame[(az > 60) & (az < 120) & (alt < 20)] = 10.0
+    # a wire crossing the sky in one frame only
+    wire = frame.copy()
+    wire[100, :] = 10.0
+    fname = str(tmp_path / 'frame.npy')
+    np.save(fname, frame)
+
+    hzn = Horizon.from_allsky(iter([fname, frame, wire]), model, 100.0,
+                              naz=36, alt_resolution=2.0)
+    assert abs(hzn.get_alt(90.0) - 20.0) <= 2.0
+    assert hzn.get_alt(270.0) <= 2.0
@@ -0,0 +1,67 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import numpy as np
+
+import pyastroprofile.HorizonDEM as HorizonDEM
+
+from pyastroprofile.Horizon import Horizon
+from pyastroprofile.HorizonDEM import EARTH_RADIUS
+from pyastroprofile.ObservatoryProfile import ObservatoryProfile
+
+def test_wall_east(tmp_path, monkeypatch):
+    # flat ground with a 100m high ridge 1km east of the observer
+    cell = 0.0001
+    dem = np.zeros((401, 401))
+    lat = 40.0
+    lon = -80.0
+    mx = EARTH_RADIUS * np.cos(np.radians(lat)) * np.radians(cell)
+    ridge_col = 200 + int(round(1000.0 / mx))
+    dem[:, ridge_col:ridge_col + 3] = 100.0
+    fname = str(tmp_path / 'dem.npy')
+    np.save(fname, dem)
+
+    loc = ObservatoryProfile.Location(latitude=lat, longitude=lon, altitude=0.0)
+    origin = (lat + 200 * cell, lon - 200 * cell)
+    hzn = Horizon.from_dem(fname, loc, origin, cell, naz=360, processes=2)
+
+    dist = (ridge_col - 200) * mx
+    expected = np.degrees(np.arctan2(100.0, dist))
+    assert abs(hzn.get_alt(90.0) - expected) < 0.2
+    assert hzn.get_alt(270.0) < 0.1
+
+    inproc = Horizon.from_dem(dem, loc, origin, cell, naz=360, processes=1)
+    assert np.allclose(inproc.horizon_table[1], hzn.horizon_table[1])
+
+    # forked workers share an array without writing it out
+    def no_tmp_dir():
+        raise AssertionError('dem written to temporary file')
+    with monkeypatch.context() as m:
+        m.setattr(HorizonDEM.multiprocessing, 'get_start_method', lambda: 'fork')
+        m.setattr(HorizonDEM.tempfile, 'TemporaryDirectory', no_tmp_dir)
+        pooled = Horizon.from_dem(dem, loc, origin, cell, naz=360, processes=2)
+    assert np.allclose(pooled.horizon_table[1], hzn.horizon_table[1])
+    assert HorizonDEM._worker_dem is None
+
+    # otherwise an array is handed to workers through a temporary file
+    monkeypatch.setattr(HorizonDEM.multiprocessing, 'get_start_method',
+                        lambda: 'spawn')
+    pooled = Horizon.from_dem(dem, loc, origin, cell, naz=360, processes=2)
+    assert np.allclose(pooled.horizon_table[1], hzn.horizon_table[1])
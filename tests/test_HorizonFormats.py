@@ -0,0 +1,57 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import numpy as np
+
+from pyastroprofile.HorizonFormats import detect_format, read_horizon
+
+def write(tmp_path, name, text):
+    fname = str(tmp_path / name)
+    with open(fname, 'w') as f:
+        f.write(text)
+    return fname
+
+def test_text_with_comments_and_bad_lines(tmp_path):
+    fname = write(tmp_path, 'site.hrz',
+                  '# my horizon\n0 10\n\n90 20 # trees\nbogus line\n180 5\n')
+    assert detect_format(fname) == 'nina'
+    arr = read_horizon(fname, chunk_lines=2)
+    assert np.array_equal(arr, [[0, 10], [90, 20], [180, 5]])
+
+def test_csv_header_column_order(tmp_path):
+    fname = write(tmp_path, 'site.csv', 'alt,az\n10,0\n20,90\n5,180\n')
+    assert detect_format(fname) == 'csv'
+    arr = read_horizon(fname)
+    assert np.array_equal(arr, [[0, 10], [90, 20], [180, 5]])
+
+def test_stellarium(tmp_path):
+    fname = write(tmp_path, 'horizon.txt',
+                  '; Stellarium landscape horizon\n0.0\t10.0\n90.0\t20.0\n')
+    assert detect_format(fname) == 'stellarium'
+    assert np.array_equal(read_horizon(fname), [[0, 10], [90, 20]])
+
+def test_non_finite_values_skipped(tmp_path, caplog):
+    fname = write(tmp_path, 'site.hrz', '0 10\nnan 3\n90 inf\n180 5\n270 8\n')
+    arr = read_horizon(fname)
+    assert np.array_equal(arr, [[0, 10], [180, 5], [270, 8]])
+    assert 'skipped 2 bad lines' in caplog.text
+    # also on the line by line path
+    fname = write(tmp_path, 'site2.hrz', '0 10\nbogus\nnan 3\n180 5\n')
+    assert np.array_equal(read_horizon(fname), [[0, 10], [180, 5]])
@@ -0,0 +1,50 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import os
+import sys
+import subprocess
+
+import pyastroprofile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_python(code):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    return subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                          capture_output=True, text=True).stdout.split()
+
+def test_import_skips_astropy():
+    out = run_python('import sys\n'
+                     'from pyastroprofile.AstroProfile import AstroProfile\n'
+                     'print("astropy" in sys.modules, "astroplan" in sys.modules)\n')
+    assert out == ['False', 'False']
+
+def test_lazy_exports():
+    for name in pyastroprofile.__all__:
+        assert getattr(pyastroprofile, name).__name__ == name
+    assert 'HorizonMask' in dir(pyastroprofile)
+    try:
+        pyastroprofile.no_such_name
+    except AttributeError:
+        pass
+    else:
+        assert False
@@ -0,0 +1,175 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import os
+
+from pyastroprofile.ObservatoryProfile import ObservatoryProfile
+
+def make_observatory():
+    obs = ObservatoryProfile(reldir=None, name='test_observatory')
+    obs.location.obsname = 'Test Location'
+    obs.location.latitude = 35.8
+    obs.location.longitude = -78.8
+    obs.location.altitude = 100.0
+    obs.location.timezone = 'US/Eastern'
+    return obs
+
+def test_observer_cached():
+    obs = make_observatory()
+    observer = obs.observer
+    assert obs.observer is observer
+    assert abs(observer.location.lat.degree - 35.8) < 1e-9
+
+    obs.location.altitude = 200.0
+    assert obs.observer is not observer
+    assert abs(obs.observer.location.height.value - 200.0) < 1e-6
+
+    obs.location.timezone = None
+    assert obs.observer is None
+
+def test_set_observer(tmp_path):
+    src = make_observatory()
+    obs = ObservatoryProfile(reldir=str(tmp_path), name='test_observatory2')
+    obs.observer = src.observer
+    assert abs(obs.location.latitude - 35.8) < 1e-9
+    assert abs(obs.location.longitude + 78.8) < 1e-9
+
+    assert obs.write()
+    obs2 = ObservatoryProfile(reldir=str(tmp_path), name='test_observatory2')
+    obs2.read()
+    assert obs2.location.timezone == 'US/Eastern'
+    assert abs(obs2.location.altitude - 100.0) < 1e-6
+    assert obs2.observer.location.lat.degree == obs.observer.location.lat.degree
+
+    # observer with a zoneinfo time zone
+    from zoneinfo import ZoneInfo
+    from astroplan import Observer
+
+    obs.observer = Observer(location=src.observer.location, name='zoneinfo',
+                            timezone=ZoneInfo('America/New_York'))
+    assert obs.location.timezone == 'America/New_York'
+    assert obs.observer.timezone.zone == 'America/New_York'
+
+def test_ephemeris_cache(tmp_path):
+    import astropy.units as u
+    from astropy.time import Time
+
+    obs = make_observatory()
+    obs._config_reldir = str(tmp_path)
+    cache = obs.ephemeris('2026-03-01', 3)
+    assert os.path.isfile(obs._get_ephemeris_filename())
+
+    night = cache.get('2026-03-02')
+    noon = Time(night['sunset'] - 0.2, format='jd')
+    dusk = obs.observer.sun_set_time(noon, which='next', horizon=-18 * u.deg)
+    assert abs(night['astronomical_dusk'] - dusk.jd) * 86400 < 5
+    assert night['sunset'] < night['astronomical_dusk'] \
+        < night['astronomical_dawn'] < night['sunrise']
+    assert cache.get('2026-03-05') is None
+
+    # reloaded from file without computing
+    obs2 = make_observatory()
+    obs2._config_reldir = str(tmp_path)
+    cache2 = obs2.ephemeris('2026-03-02', 2)
+    assert cache2.get('2026-03-02') == night
+
+    # moving the site invalidates the table
+    obs2.location.latitude = 10.0
+    assert obs2.ephemeris('2026-03-02', 1).get('2026-03-01') is None
+
+def test_visibility_windows():
+    import numpy as np
+    import astropy.units as u
+    from astropy.time import Time
+    from astropy.coordinates import SkyCoord, AltAz
+
+    obs = make_observatory()
+    obs.horizon.set_table([0, 90, 180, 270], [20, 20, 20, 20])
+
+    ra = np.array([10.0, 150.0, 250.0, 0.0])
+    dec = np.array([40.0, -10.0, 60.0, -80.0])
+    start = Time('2026-03-02T00:30:00')
+    end = Time('2026-03-02T10:30:00')
+    vis = obs.visibility_windows(ra, dec, start, end, step_minutes=10)
+
+    t = Time(vis.jd, format='jd')
+    c = SkyCoord(ra=ra[:, None] * u.deg, dec=dec[:, None] * u.deg)
+    alt = c.transform_to(AltAz(obstime=t[None, :],
+                               location=obs.observer.location)).alt.deg
+    assert np.array_equal(vis.above[np.abs(alt - 20) > 0.1],
+                          (alt > 20)[np.abs(alt - 20) > 0.1])
+
+    assert np.isnan(vis.rise_jd[3]) and vis.minutes[3] == 0
+    for i in range(3):
+        if vis.minutes[i] > 0:
+            assert start.jd <= vis.rise_jd[i] <= vis.set_jd[i] <= end.jd
+
+def test_sidereal_table(tmp_path):
+    import numpy as np
+    import astropy.units as u
+    from astropy.time import Time
+
+    obs = make_observatory()
+    obs._config_reldir = str(tmp_path)
+    start = Time('2026-03-01T00:00:00')
+    table = obs.sidereal_table(start, ndays=2)
+    assert os.path.isfile(obs._get_sidereal_filename())
+
+    jd = start.jd + np.linspace(0.01, 1.99, 50)
+    lst = Time(jd, format='jd').sidereal_time('apparent', -78.8 * u.deg).deg
+    diff = (table.lst(jd) - lst + 180) % 360 - 180
+    assert np.abs(diff).max() * 240 < 0.01
+
+    ra = np.array([10.0, 200.0])
+    transit = table.meridian_transit(ra, jd[0])
+    assert np.allclose(table.hour_angle(ra, transit), 0, atol=1e-6)
+    assert np.all(transit >= jd[0]) and np.all(transit < jd[0] + 1)
+    assert np.isnan(table.lst(start.jd + 10))
+
+    # memory-mapped copy is used by a new profile
+    obs2 = make_observatory()
+    obs2._config_reldir = str(tmp_path)
+    table2 = obs2.sidereal_table(start.jd + 0.5, ndays=1)
+    assert isinstance(table2.lst_table, np.memmap)
+
+def test_horizon_layer_edit(tmp_path):
+    obs = make_observatory()
+    obs._config_reldir = str(tmp_path)
+    obs.location.horizon_file = ['terrain.txt', 'trees.txt']
+    assert obs.write()
+    with open(tmp_path / 'terrain.txt', 'w') as f:
+        f.write('0 10\n90 10\n180 10\n270 10\n')
+    with open(tmp_path / 'trees.txt', 'w') as f:
+        f.write('0 0\n90 20\n180 0\n270 0\n')
+
+    obs2 = ObservatoryProfile(reldir=str(tmp_path), name='test_observatory')
+    assert obs2.read()
+    assert obs2.horizon.get_alt(90.0) == 20.0
+
+    # unchanged layers are not reloaded by another read
+    table = obs2.horizon.horizon_table
+    assert obs2.read()
+    assert obs2.horizon.horizon_table is table
+
+    # an edited layer is picked up when the horizon is next used
+    with open(tmp_path / 'trees.txt', 'w') as f:
+        f.write('0 0\n90 35.5\n180 0\n270 0\n')
+    assert obs2.horizon.get_alt(90.0) == 35.5
+    assert obs2.horizon.get_alt(180.0) == 10.0
@@ -0,0 +1,81 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import numpy as np
+
+from pyastroprofile.ObservatoryProfile import ObservatoryProfile
+from pyastroprofile.Planner import SeasonPlanner
+
+def make_observatory(tmp_path):
+    obs = ObservatoryProfile(reldir=str(tmp_path), name='test_observatory')
+    obs.location.obsname = 'Test Location'
+    obs.location.latitude = 35.8
+    obs.location.longitude = -78.8
+    obs.location.altitude = 100.0
+    obs.location.timezone = 'US/Eastern'
+    obs.horizon.set_table([0, 180], [15, 15])
+    return obs
+
+def test_incremental_plan(tmp_path):
+    obs = make_observatory(tmp_path)
+    ra = np.array([83.8, 201.4, 10.7])
+    dec = np.array([-5.4, -11.2, 41.3])
+
+    planner = SeasonPlanner(obs, processes=2)
+    plan = planner.plan(ra[:2], dec[:2], '2026-01-01', 9)
+    assert plan.hours.shape == (2, 9)
+    assert np.all(plan.hours >= 0) and np.all(plan.hours < 14)
+    # orion is up much of a january night and spica is not
+    assert plan.hours[0, 0] > 5 and plan.hours[1, 0] < plan.hours[0, 0]
+
+    calls = []
+    compute = planner._compute
+
+    def counting_compute(ra, dec, days, ephem):
+        calls.append((len(ra), len(days)))
+        return compute(ra, dec, days, ephem)
+
+    planner._compute = counting_compute
+    again = planner.plan(ra[:2], dec[:2], '2026-01-03', 5)
+    assert calls == []
+    assert np.array_equal(again.hours, plan.hours[:, 2:7])
+
+    # one new target and one new night
+    more = planner.plan(ra, dec, '2026-01-02', 9)
+    assert sorted(calls) == [(1, 8), (3, 1)]
+    assert np.array_equal(more.hours[:2, :8], plan.hours[:, 1:9])
+
+    # cached target left out of a request that added nights
+    (tmp_path / 'aba').mkdir()
+    obs2 = make_observatory(tmp_path / 'aba')
+    planner2 = SeasonPlanner(obs2, processes=1)
+    planner2.plan(ra[:1], dec[:1], '2026-01-01', 3)
+    planner2.plan(ra[1:2], dec[1:2], '2026-01-04', 2)
+    gap = planner2.plan(ra[:1], dec[:1], '2026-01-04', 2)
+    assert not np.any(np.isnan(gap.hours))
+    fresh = planner2._compute(ra[:1], dec[:1], gap.days,
+                              obs2.ephemeris('2026-01-04', 2))
+    assert np.allclose(gap.hours, fresh)
+
+    # changing the horizon invalidates the cache
+    obs.horizon.set_table([0, 180], [30, 30])
+    calls.clear()
+    planner.plan(ra, dec, '2026-01-02', 2)
+    assert calls == [(3, 2)]
@@ -0,0 +1,132 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import os
+import pickle
+import yaml
+
+import pyastroprofile.ProfileDict as ProfileDict
+from pyastroprofile.ProfileDict import _yaml_dump, _yaml_load, read_yaml
+from pyastroprofile.EquipmentProfile import EquipmentProfile
+
+def test_yaml_matches_pure_python(tmp_path):
+    eq = EquipmentProfile(reldir=str(tmp_path), name='test_equipment.yaml')
+    eq.camera.driver = 'CCD Simulator'
+    eq.filterwheel.names = ['L', 'R', 'G', 'B']
+    eq.mount.pier_collision_zones = [[-30.0, -20.0, -10.0, 0.0]]
+    assert eq.write()
+
+    data = {k: eq.__dict__[k]._to_dict() for k in eq.sections}
+    text = _yaml_dump(data, default_flow_style=False)
+    assert text == yaml.dump(data, Dumper=yaml.SafeDumper,
+                             default_flow_style=False)
+    with open(eq._get_config_filename()) as f:
+        assert f.read() == text
+    assert _yaml_load(text) == yaml.safe_load(text) == data
+
+def test_read_yaml_cache(tmp_path, monkeypatch):
+    parses = []
+
+    def counting_load(stream):
+        parses.append(stream)
+        return _yaml_load(stream)
+    monkeypatch.setattr(ProfileDict, '_yaml_load', counting_load)
+    monkeypatch.setattr(ProfileDict, 'YAML_CACHE_SIZE', 2)
+    ProfileDict.clear_yaml_cache()
+
+    eq = EquipmentProfile(reldir=str(tmp_path), name='test_equipment.yaml')
+    eq.filterwheel.names = ['L', 'R']
+    assert eq.write()
+
+    eq2 = EquipmentProfile(reldir=str(tmp_path), name='test_equipment.yaml')
+    eq2.read()
+    eq2.filterwheel.names.append('G')
+    eq3 = EquipmentProfile(reldir=str(tmp_path), name='test_equipment.yaml')
+    eq3.read()
+    assert len(parses) == 1
+    assert eq3.filterwheel.names == ['L', 'R']
+
+    # write drops the cached copy
+    eq2.write()
+    eq3.read()
+    assert len(parses) == 2 and eq3.filterwheel.names == ['L', 'R', 'G']
+
+    # edits by other programs are seen
+    fname = eq._get_config_filename()
+    with open(fname, 'a') as f:
+        f.write('\n')
+    read_yaml(fname)
+    assert len(parses) == 3
+
+    # least recently used file is dropped
+    for name in ('a.yaml', 'b.yaml'):
+        with open(os.path.join(str(tmp_path), name), 'w') as f:
+            f.write('x: 1\n')
+        read_yaml(os.path.join(str(tmp_path), name))
+    read_yaml(fname)
+    assert len(parses) == 6
+
+def test_compiled_profile_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv(ProfileDict.PROFILE_CACHE_ENV, '1')
+    ProfileDict.clear_yaml_cache()
+
+    fname = os.path.join(str(tmp_path), 'test.yaml')
+    with open(fname, 'w') as f:
+        f.write('camera:\n  driver: CCD Simulator\n')
+    assert read_yaml(fname) == {'camera': {'driver': 'CCD Simulator'}}
+    assert len(os.listdir(ProfileDict.get_profile_cache_dir())) == 1
+
+    # a new process would skip the yaml parse
+    def no_parse(stream):
+        raise AssertionError('yaml parsed')
+    monkeypatch.setattr(ProfileDict, '_yaml_load', no_parse)
+    ProfileDict.clear_yaml_cache()
+    assert read_yaml(fname)['camera']['driver'] == 'CCD Simulator'
+
+    # touched without changes is validated by contents
+    st = os.stat(fname)
+    os.utime(fname, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    ProfileDict.clear_yaml_cache()
+    assert read_yaml(fname)['camera']['driver'] == 'CCD Simulator'
+
+    monkeypatch.setattr(ProfileDict, '_yaml_load', _yaml_load)
+    with open(fname, 'w') as f:
+        f.write('camera:\n  driver: Other\n')
+    ProfileDict.clear_yaml_cache()
+    assert read_yaml(fname)['camera']['driver'] == 'Other'
+
+    # damaged cache files are reparsed and replaced
+    cache_fname = ProfileDict._profile_cache_filename(os.path.abspath(fname))
+    for garbage in (b'\x80\x05garbage', pickle.dumps(['not', 'a', 'dict']),
+                    pickle.dumps({'path': 'elsewhere'})):
+        with open(cache_fname, 'wb') as f:
+            f.write(garbage)
+        ProfileDict.clear_yaml_cache()
+        assert read_yaml(fname)['camera']['driver'] == 'Other'
+    with open(cache_fname, 'rb') as f:
+        assert pickle.load(f)['data'] == {'camera': {'driver': 'Other'}}
+
+    # explicit setting overrides the environment
+    ProfileDict.enable_profile_cache(False)
+    try:
+        assert not ProfileDict.profile_cache_enabled()
+    finally:
+        ProfileDict.enable_profile_cache(None)
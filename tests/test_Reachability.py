@@ -0,0 +1,75 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import numpy as np
+
+from pyastroprofile.AstroProfile import AstroProfile
+from pyastroprofile.EquipmentProfile import EquipmentProfile
+from pyastroprofile.ObservatoryProfile import ObservatoryProfile
+from pyastroprofile.Reachability import mount_reachable
+
+def make_profile():
+    ap = AstroProfile()
+    ap.equipment = EquipmentProfile(reldir=None, name='test_equipment')
+    ap.observatory = ObservatoryProfile(reldir=None, name='test_observatory')
+    ap.observatory.location.latitude = 35.8
+    ap.observatory.location.longitude = -78.8
+    ap.observatory.horizon.set_table([0, 90, 180, 270], [10, 10, 30, 10])
+    return ap
+
+def test_mount_limits():
+    mount = EquipmentProfile.Mount()
+    mount.meridian_limit_east = 15.0
+    mount.meridian_limit_west = 5.0
+    mount.pier_collision_zones = [[-30.0, -20.0, -10.0, 0.0]]
+
+    ha = np.array([-25.0, 10.0, 20.0, -10.0, 10.0])
+    dec = np.array([-5.0, 0.0, 0.0, 0.0, 0.0])
+    alt = np.full(5, 45.0)
+    assert list(mount_reachable(mount, ha, dec, alt)) == \
+        [False, True, True, True, True]
+    assert list(mount_reachable(mount, ha, dec, alt, pierside='east')) == \
+        [False, True, False, True, True]
+    assert list(mount_reachable(mount, ha, dec, alt, pierside='west')) == \
+        [False, True, True, False, True]
+
+def test_mask_combines_horizon_and_limits():
+    ap = make_profile()
+    ap.equipment.mount.min_altitude = 20.0
+    mask = ap.reachability_mask(az_resolution=1.0, alt_resolution=1.0)
+
+    # below mount limit but above horizon in the north
+    assert not mask.is_reachable(0.0, 15.0)
+    # above mount limit but below horizon in the south
+    assert not mask.is_reachable(180.0, 25.0)
+    assert mask.is_reachable(np.array([0.0, 180.0]),
+                             np.array([25.0, 35.0])).all()
+    assert ap.reachability_mask(az_resolution=1.0, alt_resolution=1.0) is mask
+
+    # declination limit excludes the pole
+    ap.equipment.mount.dec_max = 80.0
+    mask2 = ap.reachability_mask(az_resolution=1.0, alt_resolution=1.0)
+    assert mask2 is not mask
+    assert not mask2.is_reachable(0.0, 35.8)
+    assert mask2.is_reachable(0.0, 25.0)
+
+    ap.observatory.horizon.set_table([0, 180], [0, 0])
+    assert ap.reachability_mask(az_resolution=1.0,
+                                alt_resolution=1.0) is not mask2
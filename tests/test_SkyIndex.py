@@ -0,0 +1,63 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import numpy as np
+from astropy.time import Time
+
+from pyastroprofile.ObservatoryProfile import ObservatoryProfile
+from pyastroprofile.SkyIndex import SkyCellIndex
+from pyastroprofile.Visibility import target_clearance
+
+def make_observatory(tmp_path):
+    obs = ObservatoryProfile(reldir=str(tmp_path), name='test_observatory')
+    obs.location.obsname = 'Test Location'
+    obs.location.latitude = 35.8
+    obs.location.longitude = -78.8
+    obs.location.altitude = 100.0
+    obs.location.timezone = 'US/Eastern'
+    obs.horizon.set_table([0, 180], [15, 15])
+    return obs
+
+def test_sky_cell_index(tmp_path):
+    obs = make_observatory(tmp_path)
+    start = Time('2026-01-02T01:00:00').jd
+    end = Time('2026-01-02T11:00:00').jd
+    index = SkyCellIndex.build(obs, start, end, step_minutes=30,
+                               resolution=2.0)
+    assert index.bits.shape == (20, (index.ncells + 7) // 8)
+
+    # every cell is found at its own center
+    ra, dec = index.cell_centers()
+    assert np.array_equal(index.cell_of(ra, dec), np.arange(index.ncells))
+
+    rng = np.random.default_rng(5)
+    ra = rng.uniform(0, 360, 2000)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, 2000)))
+    vis = index.visible(ra, dec)
+
+    clear = target_clearance(ra, dec, index.jd, 35.8, -78.8,
+                             horizon=obs.horizon)
+    # only targets near the horizon can disagree
+    far = np.abs(clear) > 2.0
+    assert np.array_equal(vis[far], clear[far] > 0)
+
+    fname = str(tmp_path / 'index.npz')
+    index.save(fname)
+    assert np.array_equal(SkyCellIndex.load(fname).visible(ra, dec), vis)
@@ -0,0 +1,112 @@
+#
+# Test case
+#
+# Copyright 2020 Michael Fulbright
+#
+#
+#    pyastroprofile is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+import os
+import pytest
+
+from pyastroprofile.AstroProfile import AstroProfile, get_astroprofile_base_dir
+from pyastroprofile.AstroProfile import get_available_profiles
+from pyastroprofile.EquipmentProfile import EquipmentProfile
+from pyastroprofile.ProfileDict import get_default_profile, set_default_profile
+from pyastroprofile.Storage import SqliteStorage, YamlStorage, copy_profiles
+from pyastroprofile.Storage import ProfileStorage, get_storage, set_storage
+
+@pytest.fixture
+def sqlite_storage(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    storage = SqliteStorage(str(tmp_path / 'profiles.db'))
+    set_storage(storage)
+    yield storage
+    set_storage(None)
+    storage.close()
+
+def make_equipment(name):
+    return EquipmentProfile(reldir=os.path.join(get_astroprofile_base_dir(),
+                                                'equipment'), name=name)
+
+def test_sqlite_profiles(sqlite_storage, tmp_path):
+    eq = make_equipment('test_profile')
+    eq.camera.driver = 'CCD Simulator'
+    eq.filterwheel.names = ['L', 'R']
+    assert eq.write()
+    # nothing written as files
+    assert os.listdir(str(tmp_path)) == ['profiles.db']
+
+    ap = AstroProfile()
+    assert ap.create_reference('test_profile', 'test_profile', 'obs', 'set')
+    assert not ap.create_reference('test_profile', 'a', 'b', 'c')
+    assert get_available_profiles() == ['test_profile']
+
+    eq2 = make_equipment('test_profile')
+    eq2.read()
+    assert eq2.camera.driver == 'CCD Simulator'
+    assert eq2.filterwheel.names == ['L', 'R']
+
+    with pytest.raises(FileNotFoundError):
+        make_equipment('missing').read()
+
+    # locations are stored relative to the config dir
+    reopened = SqliteStorage(sqlite_storage.filename)
+    assert reopened.list(eq._get_config_dir()) == ['test_profile']
+    row = reopened._conn.execute('SELECT location FROM profiles '
+                                 'ORDER BY location').fetchall()
+    assert row == [('astroprofiles',),
+                   ('astroprofiles/equipment',)]
+    reopened.close()
+
+def test_incomplete_storage():
+    class ReadOnly(ProfileStorage):
+        def read(self, location, name):
+            return {}
+
+    with pytest.raises(TypeError):
+        ReadOnly()
+
+def test_sqlite_default_profile(sqlite_storage, tmp_path):
+    base_dir = get_astroprofile_base_dir()
+    assert get_default_profile(base_dir) is None
+    assert AstroProfile().create_reference('test_profile', 'a', 'b', 'c')
+
+    assert set_default_profile(base_dir, 'test_profile.yaml')
+    assert get_default_profile(base_dir) == 'test_profile.yaml'
+    assert os.listdir(str(tmp_path)) == ['profiles.db']
+
+    # default which no longer exists is ignored
+    assert set_default_profile(base_dir, 'missing')
+    assert get_default_profile(base_dir) is None
+    assert set_default_profile(base_dir, '')
+    assert get_default_profile(base_dir) is None
+
+def test_copy_from_yaml(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    assert isinstance(get_storage(), YamlStorage)
+    for i in range(3):
+        eq = make_equipment(f'eq{i}.yaml')
+        eq.focuser.maxpos = i
+        assert eq.write()
+
+    location = make_equipment('eq0.yaml')._get_config_dir()
+    set_default_profile(location, 'eq1.yaml')
+    db = SqliteStorage(str(tmp_path / 'profiles.db'))
+    assert copy_profiles(YamlStorage(), db, location, '*.yaml') == 3
+    assert db.list(location, 'eq[12]*') == ['eq1.yaml', 'eq2.yaml']
+    assert db.read(location, 'eq2.yaml')['focuser']['maxpos'] == 2
+    assert db.get_default(location) == 'eq1.yaml'
+    db.close()